@@ -14,6 +14,7 @@ GEMINI_API_KEY = config('GEMINI_API_KEY', default='')
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'corsheaders',
+    'channels',
     'apps.processing',
 ]
 
@@ -55,6 +57,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'ai_vision_backend.wsgi.application'
+# Realtime WebSocket frames (apps.processing.routing) are served over ASGI
+ASGI_APPLICATION = 'ai_vision_backend.asgi.application'
 
 DATABASES = {
     'default': {
@@ -86,3 +90,99 @@ REST_FRAMEWORK = {
 }
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Persistent face embedding store (memory-mapped, shared by all workers).
+# Kept outside MEDIA_ROOT so the raw embeddings are never served statically.
+FACE_EMBEDDING_STORE_PATH = config('FACE_EMBEDDING_STORE_PATH', default=os.path.join(BASE_DIR, 'data', 'face_embeddings.f32'))
+FACE_EMBEDDING_DIM = config('FACE_EMBEDDING_DIM', default=512, cast=int)
+# float32, float16 (2x smaller) or int8 (4x smaller, scalar-quantized)
+FACE_EMBEDDING_STORE_DTYPE = config('FACE_EMBEDDING_STORE_DTYPE', default='float32')
+
+# Face session lifetime and capacity. TTL is sliding (refreshed on use);
+# the least recently used sessions are evicted past either limit.
+FACE_SESSION_TTL_SECONDS = config('FACE_SESSION_TTL_SECONDS', default=3600, cast=int)
+FACE_SESSION_MAX_TTL_SECONDS = config('FACE_SESSION_MAX_TTL_SECONDS', default=86400, cast=int)
+FACE_SESSION_MAX_ENTRIES = config('FACE_SESSION_MAX_ENTRIES', default=1000, cast=int)
+FACE_SESSION_MAX_BYTES = config('FACE_SESSION_MAX_BYTES', default=64 * 1024 * 1024, cast=int)
+
+# Webcam face tracking: reuse a track's identity between embedding refreshes
+FACE_TRACK_IOU_THRESHOLD = config('FACE_TRACK_IOU_THRESHOLD', default=0.3, cast=float)
+FACE_TRACK_REEMBED_IOU = config('FACE_TRACK_REEMBED_IOU', default=0.6, cast=float)
+FACE_TRACK_REFRESH_SECONDS = config('FACE_TRACK_REFRESH_SECONDS', default=1.0, cast=float)
+
+# Bulk face enrollment
+FACE_ENROLL_WORKERS = config('FACE_ENROLL_WORKERS', default=4, cast=int)
+FACE_ENROLL_MAX_IMAGES = config('FACE_ENROLL_MAX_IMAGES', default=500, cast=int)
+FACE_ENROLL_MAX_BYTES = config('FACE_ENROLL_MAX_BYTES', default=100 * 1024 * 1024, cast=int)
+
+# Realtime gesture control: one MediaPipe Hands graph per client session
+GESTURE_MAX_GRAPHS = config('GESTURE_MAX_GRAPHS', default=8, cast=int)
+GESTURE_GRAPH_IDLE_SECONDS = config('GESTURE_GRAPH_IDLE_SECONDS', default=30, cast=int)
+# Frames of landmark history kept per hand, and frames a static gesture must hold
+GESTURE_HISTORY_SIZE = config('GESTURE_HISTORY_SIZE', default=16, cast=int)
+GESTURE_DEBOUNCE_FRAMES = config('GESTURE_DEBOUNCE_FRAMES', default=3, cast=int)
+# Client cache lifetime for the static get_gesture_info payload
+GESTURE_INFO_MAX_AGE = config('GESTURE_INFO_MAX_AGE', default=3600, cast=int)
+
+# Gesture region of interest: crop around the previous frame's hands. Off until
+# gesture.roi_ms beats gesture.full_frame_ms: crops run full palm detection each frame
+GESTURE_ROI_ENABLED = config('GESTURE_ROI_ENABLED', default=False, cast=bool)
+GESTURE_ROI_MARGIN = config('GESTURE_ROI_MARGIN', default=0.35, cast=float)  # Fraction of the hand box size
+GESTURE_ROI_MAX_SIDE = config('GESTURE_ROI_MAX_SIDE', default=320, cast=int)  # Crops are downsized to this
+GESTURE_ROI_REFRESH_FRAMES = config('GESTURE_ROI_REFRESH_FRAMES', default=30, cast=int)  # Full-frame search interval
+
+# Gesture recognition on uploaded images: static-image graphs separate from the realtime pool
+GESTURE_STATIC_GRAPHS = config('GESTURE_STATIC_GRAPHS', default=4, cast=int)
+GESTURE_STATIC_WAIT_SECONDS = config('GESTURE_STATIC_WAIT_SECONDS', default=30, cast=float)
+GESTURE_BATCH_MAX_FILES = config('GESTURE_BATCH_MAX_FILES', default=50, cast=int)
+GESTURE_BATCH_MAX_BYTES = config('GESTURE_BATCH_MAX_BYTES', default=50 * 1024 * 1024, cast=int)  # Total size of one batch
+
+# Realtime admission control: longest a newest frame waits for its session's turn,
+# and the frame rates used to recommend client capture settings
+REALTIME_ADMISSION_WAIT_SECONDS = config('REALTIME_ADMISSION_WAIT_SECONDS', default=2.0, cast=float)
+REALTIME_TARGET_FPS = config('REALTIME_TARGET_FPS', default=15, cast=int)
+REALTIME_MAX_FPS = config('REALTIME_MAX_FPS', default=30, cast=int)
+
+# Duplicate-frame skipping: mean grey-level change (0-255) on a 16x16 thumbnail
+# below which a realtime frame reuses the last result (0 disables)
+FRAME_SKIP_THRESHOLD = config('FRAME_SKIP_THRESHOLD', default=2.5, cast=float)
+FRAME_SKIP_MAX_AGE_SECONDS = config('FRAME_SKIP_MAX_AGE_SECONDS', default=1.0, cast=float)
+
+# LLM client: one process-wide Gemini configuration with shared model handles.
+# LLM_BACKEND=stub serves canned local responses for tests and benchmarks.
+LLM_BACKEND = config('LLM_BACKEND', default='gemini')
+LLM_TRANSPORT = config('LLM_TRANSPORT', default='grpc')  # 'grpc' or 'rest'
+LLM_TIMEOUT_SECONDS = config('LLM_TIMEOUT_SECONDS', default=20, cast=float)
+LLM_CHAT_TIMEOUT_SECONDS = config('LLM_CHAT_TIMEOUT_SECONDS', default=15, cast=float)
+LLM_DESCRIPTION_MODEL = config('LLM_DESCRIPTION_MODEL', default='gemini-1.5-pro')
+LLM_CHAT_MODEL = config('LLM_CHAT_MODEL', default='gemini-2.5-flash')
+LLM_STUB_LATENCY_MS = config('LLM_STUB_LATENCY_MS', default=0, cast=int)
+# Background AI descriptions (description_mode=async)
+LLM_DESCRIPTION_WORKERS = config('LLM_DESCRIPTION_WORKERS', default=4, cast=int)
+LLM_DESCRIPTION_MAX_WAIT_SECONDS = config('LLM_DESCRIPTION_MAX_WAIT_SECONDS', default=30, cast=float)
+LLM_DESCRIPTION_RETENTION_SECONDS = config('LLM_DESCRIPTION_RETENTION_SECONDS', default=86400, cast=int)
+# Description cache keyed on normalized results; set LLM_DESCRIPTION_CACHE_BACKEND
+# to a CACHES alias to persist entries and share them between processes
+LLM_DESCRIPTION_CACHE_SIZE = config('LLM_DESCRIPTION_CACHE_SIZE', default=1024, cast=int)
+LLM_DESCRIPTION_CACHE_TTL_SECONDS = config('LLM_DESCRIPTION_CACHE_TTL_SECONDS', default=86400, cast=int)
+LLM_DESCRIPTION_CACHE_BACKEND = config('LLM_DESCRIPTION_CACHE_BACKEND', default='')
+# LLM resilience: consecutive failures that open a model's circuit breaker, how long
+# it stays open, and the per-process cap on in-flight calls (with its queue wait)
+LLM_BREAKER_FAILURES = config('LLM_BREAKER_FAILURES', default=5, cast=int)
+LLM_BREAKER_RESET_SECONDS = config('LLM_BREAKER_RESET_SECONDS', default=30, cast=float)
+LLM_MAX_IN_FLIGHT = config('LLM_MAX_IN_FLIGHT', default=8, cast=int)
+LLM_QUEUE_TIMEOUT_SECONDS = config('LLM_QUEUE_TIMEOUT_SECONDS', default=2, cast=float)
+# Chatbot prompt budget (estimated tokens): the per-turn prompt is capped at
+# CHATBOT_PROMPT_TOKEN_BUDGET, of which history may use up to
+# CHATBOT_HISTORY_TOKEN_BUDGET; the last CHATBOT_HISTORY_MESSAGES messages are
+# sent verbatim and older ones are compacted into a summary
+CHATBOT_PROMPT_TOKEN_BUDGET = config('CHATBOT_PROMPT_TOKEN_BUDGET', default=1500, cast=int)
+CHATBOT_HISTORY_TOKEN_BUDGET = config('CHATBOT_HISTORY_TOKEN_BUDGET', default=1000, cast=int)
+CHATBOT_HISTORY_MESSAGES = config('CHATBOT_HISTORY_MESSAGES', default=6, cast=int)
+# Chatbot answers served without Gemini for first questions: keyword matches against
+# the feature help tables at or above the confidence threshold (share of the
+# question's weighted words the entry covers, 0-1), and cached LLM answers per page
+CHATBOT_LOCAL_ANSWERS = config('CHATBOT_LOCAL_ANSWERS', default=True, cast=bool)
+CHATBOT_LOCAL_ANSWER_THRESHOLD = config('CHATBOT_LOCAL_ANSWER_THRESHOLD', default=0.75, cast=float)
+CHATBOT_ANSWER_CACHE_SIZE = config('CHATBOT_ANSWER_CACHE_SIZE', default=512, cast=int)
+CHATBOT_ANSWER_CACHE_TTL_SECONDS = config('CHATBOT_ANSWER_CACHE_TTL_SECONDS', default=3600, cast=int)
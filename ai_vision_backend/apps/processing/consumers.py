@@ -0,0 +1,219 @@
+import asyncio
+import json
+import time
+import uuid
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from .services.facial_recognition_service import FacialRecognitionService
+from .services.gesture_control_service import GestureControlService
+from .services.face_embedding_store import FaceEmbeddingStore, FaceSessionExpired
+from .services.face_tracker import face_trackers
+from .services.description_worker import DescriptionWorker
+from .services.metrics import metrics
+
+REALTIME_MODES = ('face', 'gesture')
+
+# How often a face connection re-reads its reference embedding, so sliding
+# TTLs stay fresh and unregistered or expired sessions are noticed
+REFERENCE_REFRESH_SECONDS = 5.0
+
+
+class RealtimeFrameConsumer(AsyncWebsocketConsumer):
+    """
+    Persistent realtime channel for face recognition and gesture frames.
+
+    The client first sends a JSON config message, e.g.
+    {"type": "config", "mode": "gesture", "response_mode": "lean"} or
+    {"type": "config", "mode": "face", "session_id": "...", "det_size": "small"},
+    then streams frames as binary messages holding the encoded JPEG/WebP
+    bytes ({"type": "frame", "frame": "<base64>"} also works).
+    {"type": "description", "description_id": "..."} pushes a background AI
+    description back once it is ready.
+
+    Only the newest frame waits while one is being processed: a frame that
+    arrives before the previous pending one was picked up replaces it. Each
+    result is pushed back as soon as it is ready, tagged with the sequence
+    number of its frame and the number of frames dropped since the last one.
+    """
+
+    async def connect(self):
+        self.connection_id = f'ws:{uuid.uuid4().hex}'
+        self.config = None
+        self.seq = 0
+        self.pending = None
+        self.dropped = 0
+        self.worker = None
+        # Description pushes in flight, held so they are not collected mid-run
+        self.tasks = set()
+        self.face_service = None
+        self.reference = None
+        self.reference_checked = 0.0
+        await self.accept()
+        metrics.incr('realtime.ws_connections')
+
+    async def disconnect(self, code):
+        if self.worker is not None:
+            self.worker.cancel()
+        for task in list(self.tasks):
+            task.cancel()
+        await database_sync_to_async(self._release, thread_sensitive=False)()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            await self._enqueue(bytes_data)
+            return
+
+        try:
+            message = json.loads(text_data)
+        except (TypeError, ValueError):
+            await self._send_json({'type': 'error', 'error': 'Messages must be JSON or binary frames'})
+            return
+
+        if message.get('type') == 'config':
+            await self._configure(message)
+        elif message.get('type') == 'frame' and message.get('frame'):
+            await self._enqueue(message['frame'])
+        elif message.get('type') == 'description' and message.get('description_id'):
+            task = asyncio.create_task(self._push_description(message['description_id']))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        else:
+            await self._send_json({'type': 'error', 'error': 'Unknown message type'})
+
+    async def _configure(self, message):
+        mode = message.get('mode')
+        if mode not in REALTIME_MODES:
+            await self._send_json({'type': 'error', 'error': f'mode must be one of {", ".join(REALTIME_MODES)}'})
+            return
+        if mode == 'face' and not message.get('session_id'):
+            await self._send_json({'type': 'error', 'error': 'session_id required for face mode'})
+            return
+
+        # Switching session or mode starts from fresh tracking state
+        if self.config is not None:
+            await database_sync_to_async(self._release, thread_sensitive=False)()
+
+        self.config = {
+            'mode': mode,
+            'session_id': message.get('session_id'),
+            'det_size': message.get('det_size'),
+            'lean': message.get('response_mode') == 'lean',
+            'include_landmarks': bool(message.get('include_landmarks'))
+        }
+        self.reference = None
+        self.reference_checked = 0.0
+        await self._send_json({'type': 'configured', 'mode': mode})
+
+    async def _enqueue(self, frame):
+        if self.config is None:
+            await self._send_json({'type': 'error', 'error': 'Send a config message before frames'})
+            return
+
+        self.seq += 1
+        if self.pending is not None:
+            # Latest frame wins: the older pending frame is never processed
+            self.dropped += 1
+            metrics.incr('realtime.frames_dropped')
+        self.pending = (self.seq, frame)
+
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        """Process pending frames one at a time until none is left"""
+        while self.pending is not None:
+            seq, frame = self.pending
+            self.pending = None
+            dropped, self.dropped = self.dropped, 0
+
+            start = time.perf_counter()
+            # Reads the face embedding store; database_sync_to_async closes stale
+            # connections around the call (unlike plain sync_to_async)
+            result = await database_sync_to_async(self._process, thread_sensitive=False)(frame)
+            metrics.observe('realtime.ws_frame_ms', (time.perf_counter() - start) * 1000)
+
+            result['seq'] = seq
+            result['dropped'] = dropped
+            await self._send_json(result)
+
+    async def _push_description(self, description_id):
+        """Wait for a background description off the event loop, then send it"""
+        try:
+            description = await database_sync_to_async(DescriptionWorker().wait, thread_sensitive=False)(
+                description_id, settings.LLM_DESCRIPTION_MAX_WAIT_SECONDS
+            )
+        except Exception as e:
+            await self._send_json({'type': 'error', 'error': str(e), 'description_id': description_id})
+            return
+
+        if description is None:
+            await self._send_json({'type': 'error', 'error': 'Description not found', 'description_id': description_id})
+            return
+        await self._send_json(dict(DescriptionWorker.serialize(description), type='description'))
+
+    def _process(self, frame):
+        """Run one frame through the configured service (worker thread)"""
+        try:
+            if self.config['mode'] == 'gesture':
+                return self._process_gesture(frame)
+            return self._process_face(frame)
+        except Exception as e:
+            print(f"Realtime frame error: {e}")
+            return {'type': 'error', 'error': str(e)}
+
+    def _process_gesture(self, frame):
+        results = GestureControlService().process_hand_gestures(
+            frame,
+            session_id=self.config['session_id'] or self.connection_id,
+            lean=self.config['lean'],
+            include_landmarks=self.config['include_landmarks']
+        )
+        if 'error' in results:
+            return {'type': 'busy' if results.get('busy') else 'error', 'error': results['error']}
+        return {'type': 'result', 'mode': 'gesture', 'results': results}
+
+    def _process_face(self, frame):
+        session_id = self.config['session_id']
+        now = time.monotonic()
+        if self.reference is None or now - self.reference_checked >= REFERENCE_REFRESH_SECONDS:
+            try:
+                self.reference = FaceEmbeddingStore().get(session_id)
+            except FaceSessionExpired as e:
+                self.reference = None
+                return {'type': 'error', 'error': f'Session {e.reason}, please register the face again', 'reason': e.reason}
+            self.reference_checked = now
+            if self.reference is None:
+                return {'type': 'error', 'error': 'Session not found'}
+
+        if self.face_service is None:
+            self.face_service = FacialRecognitionService()
+
+        results = self.face_service.process_webcam_frame(
+            frame, self.reference['embedding'], self.reference['name'],
+            tracker=face_trackers.get(self.connection_id),
+            det_size=self.config['det_size']
+        )
+        if results['error']:
+            return {'type': 'error', 'error': results['error']}
+
+        faces = results['faces']
+        return {
+            'type': 'result',
+            'mode': 'face',
+            'faces': faces,
+            'reference_name': self.reference['name'],
+            'total_faces': len(faces),
+            'matched_faces': len([f for f in faces if f['is_match']]),
+            'frame_skipped': results['skipped'],
+            'timing': self.face_service.get_timing(skipped=results['skipped'])
+        }
+
+    def _release(self):
+        """Free the connection's tracking graph and face tracker"""
+        if self.config is not None and self.config['mode'] == 'gesture' and not self.config['session_id']:
+            GestureControlService().graph_pool.discard(self.connection_id)
+        face_trackers.discard(self.connection_id)
+
+    async def _send_json(self, payload):
+        await self.send(text_data=json.dumps(payload))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processing', '0003_faceembedding'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='faceembedding',
+            name='row',
+            field=models.PositiveIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='faceembedding',
+            name='status',
+            field=models.CharField(choices=[('active', 'Active'), ('expired', 'Expired'), ('evicted', 'Evicted')], default='active', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='faceembedding',
+            name='ttl_seconds',
+            field=models.PositiveIntegerField(default=3600),
+        ),
+        migrations.AddField(
+            model_name='faceembedding',
+            name='last_used_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='faceembedding',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
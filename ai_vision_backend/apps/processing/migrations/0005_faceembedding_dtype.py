@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processing', '0004_faceembedding_ttl'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='faceembedding',
+            name='row',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='faceembedding',
+            name='dtype',
+            field=models.CharField(default='float32', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='faceembedding',
+            name='scale',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AddField(
+            model_name='faceembedding',
+            name='fidelity',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AddConstraint(
+            model_name='faceembedding',
+            constraint=models.UniqueConstraint(fields=('dtype', 'row'), name='unique_face_embedding_row'),
+        ),
+    ]
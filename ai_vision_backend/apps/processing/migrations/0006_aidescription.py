@@ -0,0 +1,27 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:20
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('processing', '0005_faceembedding_dtype'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIDescription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description_id', models.UUIDField(default=uuid.uuid4, unique=True)),
+                ('feature', models.CharField(max_length=30)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('text', models.TextField(blank=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
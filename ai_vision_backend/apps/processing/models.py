@@ -1,4 +1,6 @@
 from django.db import models
+import uuid
+from django.utils import timezone
 from apps.demos.models import DemoSession
 
 class ProcessingResult(models.Model):
@@ -57,3 +59,56 @@ class ImageSegmentation(models.Model):
 
     def __str__(self):
         return f"Image Segmentation - {self.session.session_id}"
+
+class FaceEmbedding(models.Model):
+    """Index entry for a face embedding stored in the shared embedding file"""
+    session_id = models.UUIDField(unique=True, default=uuid.uuid4)
+    name = models.CharField(max_length=100)
+    # Row number in the memory-mapped embedding file; released when the session ends
+    row = models.PositiveIntegerField(null=True, blank=True)
+    # Storage encoding of the row, and the per-vector scale for int8
+    dtype = models.CharField(max_length=10, default='float32')
+    scale = models.FloatField(default=1.0)
+    fidelity = models.FloatField(default=1.0)  # Cosine similarity of the stored row to the original
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ('active', 'Active'),
+            ('expired', 'Expired'),
+            ('evicted', 'Evicted')
+        ],
+        default='active'
+    )
+    ttl_seconds = models.PositiveIntegerField(default=3600)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dtype', 'row'], name='unique_face_embedding_row')
+        ]
+
+    def __str__(self):
+        return f"Face Embedding - {self.name} ({self.session_id})"
+
+class AIDescription(models.Model):
+    """An LLM description generated in the background for a processing result"""
+    description_id = models.UUIDField(unique=True, default=uuid.uuid4)
+    feature = models.CharField(max_length=30)
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            ('pending', 'Pending'),
+            ('completed', 'Completed'),
+            ('failed', 'Failed')
+        ],
+        default='pending'
+    )
+    text = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"AI Description - {self.feature} ({self.status})"
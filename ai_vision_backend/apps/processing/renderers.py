@@ -0,0 +1,20 @@
+import json
+from rest_framework.renderers import BaseRenderer
+
+
+class ServerSentEventRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept `Accept: text/event-stream` on streaming
+    endpoints. The events themselves are written by a StreamingHttpResponse;
+    this only renders error payloads that go through a DRF Response.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, (bytes, str)):
+            return data
+        return f'event: error\ndata: {json.dumps(data)}\n\n'.encode('utf-8')
@@ -0,0 +1,7 @@
+from django.urls import path  # pyright: ignore[reportMissingImports]
+from .consumers import RealtimeFrameConsumer
+
+websocket_urlpatterns = [
+    # Persistent realtime channel for face recognition and gesture frames
+    path('ws/processing/realtime/', RealtimeFrameConsumer.as_asgi()),
+]
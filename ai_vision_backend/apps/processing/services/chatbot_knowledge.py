@@ -0,0 +1,176 @@
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from django.conf import settings
+from .metrics import metrics
+
+# Words that name each feature; a question must mention one of them (or be
+# asked on that feature's page) before its entries are considered
+FEATURE_TERMS = {
+    'object-detection': 'object objects detection detect detector yolo yolov8',
+    'facial-recognition': 'face faces facial recognition recognize insightface',
+    'gesture-control': 'gesture gestures hand hands mediapipe',
+    'image-segmentation': 'segmentation segment segmenting deeplab deeplabv3 pixel',
+}
+
+# Question words that point at each field of the help tables
+FIELD_TERMS = {
+    'description': 'work works about explain overview',
+    'usage': 'how use using start started try steps',
+    'supported_formats': 'supported formats format file files type types upload accept',
+    'output': 'output result results return returns show shows see look like',
+    'features': 'features capabilities can support',
+    'gestures': 'gestures supported which available list recognize',
+    'overview': 'how many classes kinds detect can',
+}
+
+FIELD_LABELS = {
+    'usage': 'How to use it',
+    'supported_formats': 'Supported formats',
+    'output': 'Output',
+    'features': 'Features',
+    'gestures': 'Supported gestures',
+}
+
+STOPWORDS = set('a an the and or of to in on for with by at it its this that i you me my we are be can do does is what'.split())
+
+
+def normalize_question(text):
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return ' '.join(re.findall(r'[a-z0-9+]+', text.lower()))
+
+
+def tokenize(text):
+    tokens = []
+    for word in re.findall(r'[a-z0-9+]+', text.lower()):
+        if word in STOPWORDS:
+            continue
+        # Crude plural folding so "gesture" and "gestures" match
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class KnowledgeIndex:
+    """
+    TF-IDF keyword index over the chatbot's static help tables.
+
+    Each (feature, field) pair of get_feature_help, plus each feature page's
+    context text, is one entry. Only entries of the features a question
+    mentions (or the current page's feature) are candidates, and only if the
+    question contains one of the entry's field words, so a question merely
+    naming a feature ("is gesture control accurate?") never matches. The
+    score is the IDF-weighted share of the question's words found in the
+    entry: words the index does not know ("low light", "masks") count
+    against it, so questions the tables cannot answer stay below the
+    threshold. The best entry answers when the score reaches the threshold.
+    """
+
+    def __init__(self, service):
+        self.entries = []
+        for feature, terms in FEATURE_TERMS.items():
+            help_info = service.get_feature_help(feature)
+            description = help_info.get('description', '').rstrip('.')
+            for field, value in help_info.items():
+                if field == 'description':
+                    answer = f"{description}. {help_info.get('usage', '').rstrip('.')}."
+                else:
+                    answer = f"{description}. {FIELD_LABELS.get(field, field.replace('_', ' ').capitalize())}: {value}."
+                self._add(feature, field, terms, FIELD_TERMS.get(field, ''), value, answer)
+
+            # Page text, without its "Current Context" line
+            overview = [
+                line for line in service.get_context_info(feature).strip().splitlines()
+                if not line.startswith('Current Context:')
+            ]
+            self._add(feature, 'overview', terms, FIELD_TERMS['overview'], ' '.join(overview), ' '.join(overview))
+
+        document_count = len(self.entries)
+        frequencies = Counter(token for entry in self.entries for token in entry['tokens'])
+        self.idf = {token: math.log(1 + document_count / count) for token, count in frequencies.items()}
+        self.max_idf = math.log(1 + document_count)
+
+        self.feature_tokens = {feature: set(tokenize(terms)) for feature, terms in FEATURE_TERMS.items()}
+
+    def _add(self, feature, field, feature_terms, field_terms, text, answer):
+        self.entries.append({
+            'feature': feature,
+            'field': field,
+            'field_tokens': set(tokenize(field_terms)),
+            'tokens': set(tokenize(f'{feature_terms} {field_terms} {text}')),
+            'answer': answer
+        })
+
+    def search(self, question, context=None):
+        """Return (entry, score) for the best grounded entry, or (None, 0.0)"""
+        counts = Counter(tokenize(question))
+        if not counts:
+            return None, 0.0
+
+        features = [feature for feature, tokens in self.feature_tokens.items() if tokens & counts.keys()]
+        if not features and context in self.feature_tokens:
+            features = [context]
+        if not features:
+            return None, 0.0
+
+        # Words the index has never seen get the highest weight
+        weights = {token: count * self.idf.get(token, self.max_idf) for token, count in counts.items()}
+        total = sum(weights.values())
+        best, best_score = None, 0.0
+        for entry in self.entries:
+            if entry['feature'] not in features or not entry['field_tokens'] & counts.keys():
+                continue
+            score = sum(weight for token, weight in weights.items() if token in entry['tokens']) / total
+            if score > best_score:
+                best, best_score = entry, score
+        return best, best_score
+
+
+class AnswerCache:
+    """LRU of LLM answers keyed on (context, normalized question), with a TTL"""
+
+    def __init__(self, size, ttl_seconds):
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, context, question):
+        key = (context, normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            text, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return text
+
+    def set(self, context, question, text):
+        key = (context, normalize_question(question))
+        with self._lock:
+            self._entries[key] = (text, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+answer_cache = AnswerCache(settings.CHATBOT_ANSWER_CACHE_SIZE, settings.CHATBOT_ANSWER_CACHE_TTL_SECONDS)
+
+
+def _local_hit_rate():
+    local = metrics.get('chatbot.answers_local') + metrics.get('chatbot.answers_cached')
+    total = local + metrics.get('chatbot.answers_llm')
+    return round(local / total, 3) if total else 0.0
+
+
+metrics.register_gauge('chatbot.local_hit_rate', _local_hit_rate)
+metrics.register_gauge('chatbot.answer_cache_size', lambda: len(answer_cache))
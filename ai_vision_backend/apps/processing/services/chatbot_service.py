@@ -1,21 +1,17 @@
-import google.generativeai as genai
-import os
 from django.conf import settings
 from datetime import datetime
 import json
+import math
+import threading
+import time
+from .llm_client import LLMClientManager, LLMUnavailable
+from .metrics import metrics
+from .chatbot_knowledge import KnowledgeIndex, answer_cache
+from .gesture_rules import describe_gestures
 
-class ChatbotService:
-    def __init__(self):
-        # Initialize Gemini API using existing configuration
-        api_key = getattr(settings, 'GEMINI_API_KEY', None) or os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY is required in Django settings or environment variables")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Define system context about the AI Vision project
-        self.system_prompt = """
+# Static project description, sent once as the model's system instruction
+# instead of being repeated at the top of every turn's prompt
+SYSTEM_PROMPT = f"""
 You are an AI assistant for the AI Vision Lab project, a comprehensive computer vision platform. You help users understand and use the various AI vision features.
 
 PROJECT OVERVIEW:
@@ -34,11 +30,35 @@ TECHNICAL CAPABILITIES:
 FEATURE DETAILS:
 - Object Detection: Detects and classifies objects with confidence scores, supports both images and videos
 - Facial Recognition: Can register faces and recognize them in real-time, supports webcam input
-- Gesture Control: Recognizes hand gestures like thumbs up, peace sign, pointing, fist, OK sign, wave, and open hand
+- Gesture Control: Recognizes these hand gestures (with the UI action each triggers): {describe_gestures()}
 - Image Segmentation: Segments images at pixel level to identify different objects and regions
 
 You should provide helpful, accurate information about these features and help users understand how to use them effectively.
+
+Please provide a helpful, accurate response. Be conversational and informative. If the user is asking about a specific feature, provide detailed information about that feature. If they're asking general questions, feel free to answer them while staying relevant to the AI Vision Lab context when appropriate.
+
+Keep your response concise but informative (2-4 sentences typically).
 """
+
+# Characters per line of a compacted older turn in the rolling summary
+SUMMARY_LINE_CHARS = 80
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) without an API round trip"""
+    return math.ceil(len(text) / 4) if text else 0
+
+
+class ChatbotService:
+    # Keyword index over the static help tables, built once per process
+    _index = None
+    _index_lock = threading.Lock()
+
+    def __init__(self):
+        # Shared, already-configured model handle; the static project
+        # description travels as its system instruction
+        self.system_prompt = SYSTEM_PROMPT
+        self.model = LLMClientManager().model(settings.LLM_CHAT_MODEL, system_instruction=SYSTEM_PROMPT)
     
     def get_context_info(self, context):
         """Get context-specific information based on current page/feature"""
@@ -60,10 +80,10 @@ This feature uses InsightFace for face detection and recognition.
 Users can register faces by uploading photos and then recognize those faces in real-time using webcam.
 The system provides confidence scores and can handle multiple faces in a single image.
 """,
-            'gesture-control': """
+            'gesture-control': f"""
 Current Context: You're on the Gesture Control feature page.
 This feature uses MediaPipe Hands for real-time hand tracking and gesture recognition.
-Supported gestures: Thumbs Up (next), Peace Sign (previous), Pointing (select), Fist (close), OK Sign (confirm), Wave (toggle), Open Hand (menu).
+Supported gestures: {describe_gestures()}.
 Users can control the interface using hand gestures detected through webcam.
 """,
             'image-segmentation': """
@@ -89,18 +109,71 @@ Current Context: You're browsing the AI Vision Lab website.
 This is a comprehensive computer vision platform with multiple AI-powered features for object detection, facial recognition, gesture control, and image segmentation.
 """)
     
-    def format_conversation_history(self, history):
-        """Format conversation history for the prompt"""
+    def format_conversation_history(self, history, budget=None):
+        """
+        Format conversation history for the prompt within `budget` tokens.
+
+        Recent messages are kept verbatim, newest first, up to
+        CHATBOT_HISTORY_MESSAGES and the budget; older ones are compacted
+        into a summary of one short line per message, newest first, and the
+        oldest are dropped once the summary's share of the budget is used.
+        """
         if not history or len(history) == 0:
             return "No previous conversation history."
-        
-        formatted_history = "Previous conversation:\n"
-        for msg in history[-10:]:  # Keep last 10 messages
-            role = "User" if msg.get('role') == 'user' else "Assistant"
-            content = msg.get('content', '')
-            formatted_history += f"{role}: {content}\n"
-        
-        return formatted_history
+        if budget is None:
+            budget = settings.CHATBOT_HISTORY_TOKEN_BUDGET
+
+        lines = [self._history_line(msg) for msg in history]
+        window = lines[max(0, len(lines) - settings.CHATBOT_HISTORY_MESSAGES):]
+        # When anything has to be compacted, keep a quarter of the budget for its summary
+        fits = len(window) == len(lines) and sum(estimate_tokens(line) for line in lines) <= budget
+        recent_budget = budget if fits else budget - budget // 4
+        recent = []
+        used = 0
+        for line in reversed(window):
+            cost = estimate_tokens(line)
+            if used + cost > recent_budget:
+                break
+            recent.insert(0, line)
+            used += cost
+
+        formatted_history = ""
+        older = lines[:len(lines) - len(recent)]
+        if older:
+            summary, kept = self.summarize_history(older, budget=max(0, budget - used))
+            if summary:
+                formatted_history += "Summary of earlier conversation:\n" + summary + "\n\n"
+            metrics.incr('chatbot.history_messages_compacted', kept)
+            if kept < len(older):
+                metrics.incr('chatbot.history_messages_dropped', len(older) - kept)
+
+        if recent:
+            formatted_history += "Previous conversation:\n" + "\n".join(recent) + "\n"
+        return formatted_history or "No previous conversation history."
+
+    @staticmethod
+    def summarize_history(lines, budget):
+        """
+        Compact older history lines into short lines, keeping the newest that
+        fit the budget. Returns (summary text, number of lines kept).
+        """
+        summary = []
+        used = 0
+        for line in reversed(lines):
+            if len(line) > SUMMARY_LINE_CHARS:
+                line = line[:SUMMARY_LINE_CHARS].rsplit(' ', 1)[0] + '...'
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                break
+            summary.insert(0, '- ' + line)
+            used += cost
+        return "\n".join(summary), len(summary)
+
+    @staticmethod
+    def _history_line(msg):
+        role = "User" if msg.get('role') == 'user' else "Assistant"
+        content = ' '.join(str(msg.get('content', '')).split())
+        return f"{role}: {content}"
     
     def generate_response(self, message, context='home', history=None):
         """
@@ -112,47 +185,176 @@ This is a comprehensive computer vision platform with multiple AI-powered featur
             history (list): Previous conversation messages
         
         Returns:
-            dict: Response with message and timestamp
+            dict: Response with message, timestamp and source (local, cache, llm or fallback)
         """
+        local = self.answer_locally(message, context, history)
+        if local is not None:
+            return local
+
+        start = time.perf_counter()
         try:
-            # Get context-specific information
-            context_info = self.get_context_info(context)
+            prompt = self.build_prompt(message, context, history)
             
-            # Format conversation history
-            history_text = self.format_conversation_history(history)
+            # Generate response using Gemini
+            response = self.model.generate_content(prompt, timeout=settings.LLM_CHAT_TIMEOUT_SECONDS)
             
-            # Create the full prompt
-            prompt = f"""
-{self.system_prompt}
+            text = response.text.strip()
+            self._remember_answer(message, context, history, text)
+            return {
+                'response': text,
+                'timestamp': datetime.now().isoformat(),
+                'context': context,
+                'source': 'llm'
+            }
 
-{context_info}
+        except LLMUnavailable as e:
+            return self._degraded_response(context, e)
+            
+        except Exception as e:
+            print(f"Error generating chatbot response: {e}")
+            return self._error_response(context, e)
 
-{history_text}
+        finally:
+            # Failed and degraded turns count too
+            metrics.observe('chatbot.turn_ms', (time.perf_counter() - start) * 1000)
 
-Current User Message: {message}
+    def stream_response(self, message, context='home', history=None):
+        """
+        Generate the chatbot response incrementally.
 
-Please provide a helpful, accurate response. Be conversational and informative. If the user is asking about a specific feature, provide detailed information about that feature. If they're asking general questions, feel free to answer them while staying relevant to the AI Vision Lab context when appropriate.
+        Yields ('token', text) for each chunk as Gemini produces it, then
+        ('done', response) where response has the same fields as
+        generate_response. If the model fails the done event carries the
+        usual fallback response.
+        """
+        local = self.answer_locally(message, context, history)
+        if local is not None:
+            yield 'token', local['response']
+            yield 'done', local
+            return
 
-Keep your response concise but informative (2-4 sentences typically).
-"""
-            
-            # Generate response using Gemini
-            response = self.model.generate_content(prompt)
-            
-            return {
-                'response': response.text.strip(),
+        chunks = []
+        start = time.perf_counter()
+        try:
+            prompt = self.build_prompt(message, context, history)
+            for text in self.model.stream_content(prompt, timeout=settings.LLM_CHAT_TIMEOUT_SECONDS):
+                chunks.append(text)
+                yield 'token', text
+
+            response = ''.join(chunks).strip()
+            self._remember_answer(message, context, history, response)
+            yield 'done', {
+                'response': response,
                 'timestamp': datetime.now().isoformat(),
-                'context': context
+                'context': context,
+                'source': 'llm'
             }
-            
+
+        except LLMUnavailable as e:
+            yield 'done', self._degraded_response(context, e)
+
         except Exception as e:
-            print(f"Error generating chatbot response: {e}")
+            print(f"Error streaming chatbot response: {e}")
+            yield 'done', self._error_response(context, e)
+
+        finally:
+            metrics.observe('chatbot.turn_ms', (time.perf_counter() - start) * 1000)
+
+    def answer_locally(self, message, context='home', history=None):
+        """
+        Answer the first question of a conversation without Gemini when
+        possible: from the keyword index over the help tables if it matches
+        with at least CHATBOT_LOCAL_ANSWER_THRESHOLD confidence, else from
+        cached LLM answers to the same question on the same page. Follow-ups
+        depend on the conversation, so they always go to the model.
+        Returns a response dict or None.
+        """
+        if history:
+            return None
+
+        if settings.CHATBOT_LOCAL_ANSWERS:
+            entry, score = self.knowledge_index().search(message, context)
+            metrics.observe('chatbot.local_answer_score', round(score, 3))
+            if entry is not None and score >= settings.CHATBOT_LOCAL_ANSWER_THRESHOLD:
+                metrics.incr('chatbot.answers_local')
+                return {
+                    'response': entry['answer'],
+                    'timestamp': datetime.now().isoformat(),
+                    'context': context,
+                    'source': 'local'
+                }
+
+        cached = answer_cache.get(context, message)
+        if cached is not None:
+            metrics.incr('chatbot.answers_cached')
             return {
-                'response': "I apologize, but I'm having trouble processing your request right now. Please try again in a moment.",
+                'response': cached,
                 'timestamp': datetime.now().isoformat(),
                 'context': context,
-                'error': str(e)
+                'source': 'cache'
             }
+        return None
+
+    def _remember_answer(self, message, context, history, text):
+        metrics.incr('chatbot.answers_llm')
+        if not history and text:
+            answer_cache.set(context, message, text)
+
+    def knowledge_index(self):
+        if ChatbotService._index is None:
+            with ChatbotService._index_lock:
+                if ChatbotService._index is None:
+                    ChatbotService._index = KnowledgeIndex(self)
+        return ChatbotService._index
+
+    def build_prompt(self, message, context='home', history=None):
+        """
+        Per-turn prompt: page context, history and message. The system prompt
+        is the model's system instruction, and history gets whatever is left
+        of CHATBOT_PROMPT_TOKEN_BUDGET after the other parts.
+        """
+        # Get context-specific information
+        context_info = self.get_context_info(context)
+        message = message.strip()
+        
+        fixed_tokens = estimate_tokens(context_info) + estimate_tokens(message)
+        history_budget = min(
+            settings.CHATBOT_HISTORY_TOKEN_BUDGET,
+            max(0, settings.CHATBOT_PROMPT_TOKEN_BUDGET - fixed_tokens)
+        )
+        
+        # Format conversation history
+        history_text = self.format_conversation_history(history, budget=history_budget)
+        
+        prompt = f"""
+{context_info}
+
+{history_text}
+
+Current User Message: {message}
+"""
+        metrics.observe('chatbot.prompt_tokens_estimated', estimate_tokens(prompt))
+        return prompt
+
+    def _degraded_response(self, context, error):
+        """Gemini is failing or saturated: answer from the local page context"""
+        return {
+            'response': "I can't reach the AI model right now, but here is some information about this page:\n" + self.get_context_info(context).strip(),
+            'timestamp': datetime.now().isoformat(),
+            'context': context,
+            'source': 'fallback',
+            'error': str(error),
+            'degraded': True
+        }
+
+    def _error_response(self, context, error):
+        return {
+            'response': "I apologize, but I'm having trouble processing your request right now. Please try again in a moment.",
+            'timestamp': datetime.now().isoformat(),
+            'context': context,
+            'source': 'fallback',
+            'error': str(error)
+        }
     
     def get_feature_help(self, feature):
         """Get specific help information for a feature"""
@@ -172,7 +374,7 @@ Keep your response concise but informative (2-4 sentences typically).
             'gesture-control': {
                 'description': 'Control interface using hand gestures detected via webcam',
                 'usage': 'Enable webcam and use hand gestures to navigate and interact with the interface',
-                'gestures': 'Thumbs Up (next), Peace Sign (previous), Pointing (select), Fist (close), OK Sign (confirm), Wave (toggle), Open Hand (menu)',
+                'gestures': describe_gestures(),
                 'output': 'Real-time gesture recognition with UI control actions'
             },
             'image-segmentation': {
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from .metrics import metrics
+
+
+class DescriptionCache:
+    """
+    Cache of generated descriptions keyed on a normalized result summary.
+
+    Lookups hit an in-process LRU dict first, so repeated summaries return in
+    microseconds. Entries expire after LLM_DESCRIPTION_CACHE_TTL_SECONDS and
+    the least recently used entry is evicted beyond
+    LLM_DESCRIPTION_CACHE_SIZE. If LLM_DESCRIPTION_CACHE_BACKEND names a
+    Django cache, entries are also written there so they survive restarts
+    and are shared between worker processes.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super(DescriptionCache, cls).__new__(cls)
+                    instance._entries = OrderedDict()
+                    metrics.register_gauge('llm.description_cache_size', lambda: len(instance._entries))
+                    cls._instance = instance
+        return cls._instance
+
+    @staticmethod
+    def make_key(feature, summary, version):
+        """Stable key for a feature, its normalized summary and the prompt version"""
+        payload = json.dumps([feature, version, summary], sort_keys=True, default=str)
+        return 'description:' + hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                text, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    metrics.incr('llm.description_cache_hits')
+                    return text
+                del self._entries[key]
+
+        backend = self._backend()
+        if backend is not None:
+            try:
+                text = backend.get(key)
+            except Exception as e:
+                print(f"Description cache backend error: {e}")
+                text = None
+            if text is not None:
+                self._remember(key, text)
+                metrics.incr('llm.description_cache_backend_hits')
+                return text
+
+        metrics.incr('llm.description_cache_misses')
+        return None
+
+    def set(self, key, text):
+        self._remember(key, text)
+        backend = self._backend()
+        if backend is not None:
+            try:
+                backend.set(key, text, timeout=settings.LLM_DESCRIPTION_CACHE_TTL_SECONDS)
+            except Exception as e:
+                print(f"Description cache backend error: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, text):
+        expires = time.monotonic() + settings.LLM_DESCRIPTION_CACHE_TTL_SECONDS
+        with self._lock:
+            self._entries[key] = (text, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.LLM_DESCRIPTION_CACHE_SIZE:
+                self._entries.popitem(last=False)
+                metrics.incr('llm.description_cache_evictions')
+
+    @staticmethod
+    def _backend():
+        alias = settings.LLM_DESCRIPTION_CACHE_BACKEND
+        if not alias:
+            return None
+        from django.core.cache import caches
+        return caches[alias]
@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from .metrics import metrics
+
+
+class DescriptionWorker:
+    """
+    Background pool for LLM descriptions.
+
+    Endpoints return their detections right away with a description id; the
+    LLM call runs on this pool and its text is saved to an AIDescription row,
+    which clients fetch later (optionally waiting for it) or have pushed over
+    the realtime WebSocket.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super(DescriptionWorker, cls).__new__(cls)
+                    instance.executor = ThreadPoolExecutor(
+                        max_workers=settings.LLM_DESCRIPTION_WORKERS,
+                        thread_name_prefix='llm-description'
+                    )
+                    instance._events = {}
+                    instance._submitted = 0
+                    cls._instance = instance
+        return cls._instance
+
+    def submit(self, feature, func, *args, fallback=''):
+        """
+        Queue func(*args) to produce the description text. If it raises, the
+        description is marked failed with `fallback` as its text.
+        Returns the description id as a string.
+        """
+        from ..models import AIDescription
+        description = AIDescription.objects.create(feature=feature)
+        description_id = str(description.description_id)
+
+        with self._lock:
+            self._events[description_id] = threading.Event()
+            self._submitted += 1
+            prune = self._submitted % 100 == 0
+        if prune:
+            self._prune()
+
+        metrics.incr('llm.descriptions_submitted')
+        self.executor.submit(self._run, description_id, func, args, fallback)
+        return description_id
+
+    def wait(self, description_id, timeout):
+        """Return the AIDescription, waiting up to `timeout` seconds for it to finish"""
+        from ..models import AIDescription
+        deadline = time.monotonic() + timeout
+        event = self._events.get(description_id)
+        if event is not None:
+            event.wait(timeout)
+
+        while True:
+            description = AIDescription.objects.filter(description_id=description_id).first()
+            if description is None or description.status != 'pending' or time.monotonic() >= deadline:
+                return description
+            # Submitted by another worker process: poll the row
+            time.sleep(min(0.25, max(0.0, deadline - time.monotonic())))
+
+    def _run(self, description_id, func, args, fallback):
+        from ..models import AIDescription
+        close_old_connections()
+        start = time.perf_counter()
+        try:
+            text = func(*args)
+            AIDescription.objects.filter(description_id=description_id).update(
+                status='completed', text=text or '', completed_at=timezone.now()
+            )
+            metrics.incr('llm.descriptions_completed')
+        except Exception as e:
+            print(f"Background description error: {e}")
+            AIDescription.objects.filter(description_id=description_id).update(
+                status='failed', text=fallback, error=str(e), completed_at=timezone.now()
+            )
+            metrics.incr('llm.descriptions_failed')
+        finally:
+            metrics.observe('llm.description_ms', (time.perf_counter() - start) * 1000)
+            with self._lock:
+                event = self._events.pop(description_id, None)
+            if event is not None:
+                event.set()
+            close_old_connections()
+
+    @staticmethod
+    def _prune():
+        from ..models import AIDescription
+        cutoff = timezone.now() - timedelta(seconds=settings.LLM_DESCRIPTION_RETENTION_SECONDS)
+        AIDescription.objects.filter(created_at__lt=cutoff).exclude(status='pending').delete()
+
+    @staticmethod
+    def serialize(description):
+        return {
+            'description_id': str(description.description_id),
+            'feature': description.feature,
+            'status': description.status,
+            'ai_description': description.text if description.status != 'pending' else None,
+            'error': description.error or None,
+            'created_at': description.created_at.isoformat(),
+            'completed_at': description.completed_at.isoformat() if description.completed_at else None
+        }
@@ -0,0 +1,392 @@
+import os
+import uuid
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from .metrics import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+# Supported on-disk embedding encodings and their file suffixes
+STORAGE_DTYPES = {
+    'float32': (np.float32, '.f32'),
+    'float16': (np.float16, '.f16'),
+    'int8': (np.int8, '.i8'),
+}
+
+
+class FaceSessionExpired(Exception):
+    """Raised when a face session existed but has expired or been evicted"""
+
+    def __init__(self, reason):
+        super().__init__(f"Face session {reason}")
+        self.reason = reason
+
+
+class FaceEmbeddingStore:
+    """
+    Persistent face embedding store shared by every worker process.
+
+    Embeddings are L2-normalized and written as fixed-size rows to a flat
+    file per storage dtype (float32, float16 or scalar-quantized int8) that
+    each worker memory-maps read-only, so lookups are a single row copy.
+    The FaceEmbedding table maps session ids to row numbers and tracks a
+    sliding TTL per session; the least recently used sessions are evicted
+    once the entry or byte limit is reached, and their rows are reused.
+    """
+    # Minimum delay between last-used updates for a session, to avoid a DB write per frame
+    TOUCH_INTERVAL_SECONDS = 30
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super(FaceEmbeddingStore, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # Prevent re-initialization if already initialized
+        if hasattr(self, '_initialized'):
+            return
+
+        self.storage = settings.FACE_EMBEDDING_STORE_DTYPE
+        if self.storage not in STORAGE_DTYPES:
+            raise ValueError(f"Unsupported face embedding dtype: {self.storage}")
+
+        self.dim = settings.FACE_EMBEDDING_DIM
+        self.dtype = np.dtype(STORAGE_DTYPES[self.storage][0])
+        self.row_bytes = self.dim * self.dtype.itemsize
+        self.path = self._path_for(self.storage)
+
+        # Read-only mapping of each embedding file and its row count, by dtype
+        self._maps = {}
+        self._map_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+        # Session lifetime and capacity limits
+        self.default_ttl = settings.FACE_SESSION_TTL_SECONDS
+        self.max_ttl = settings.FACE_SESSION_MAX_TTL_SECONDS
+        self.max_bytes = settings.FACE_SESSION_MAX_BYTES
+        self.capacity = max(1, min(settings.FACE_SESSION_MAX_ENTRIES, self.max_bytes // self.row_bytes))
+
+        metrics.register_gauge('face_sessions.active', self.active_count)
+        metrics.register_gauge('face_sessions.bytes', lambda: self.active_count() * self.row_bytes)
+        self._initialized = True
+
+    def add(self, name, embedding, ttl=None):
+        """
+        Store an embedding for a new session and return its index entry.
+        Expired sessions are released and the least recently used sessions
+        are evicted first if the store is full.
+        """
+        from ..models import FaceEmbedding
+
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Expected a {self.dim}-dimensional embedding, got {vector.shape[0]}")
+
+        stored, scale, fidelity = self.encode(vector, self.storage)
+        ttl = self._clamp_ttl(ttl)
+
+        with self._exclusive() as fd:
+            now = timezone.now()
+            self._expire_stale(now)
+            self._evict_lru(keep=self.capacity - 1)
+
+            row = self._free_row(fd)
+            os.lseek(fd, row * self.row_bytes, os.SEEK_SET)
+            os.write(fd, stored.tobytes())
+            os.fsync(fd)
+
+            # Create the index entry while still holding the file lock so
+            # other workers see the row as taken
+            return FaceEmbedding.objects.create(
+                name=name,
+                row=row,
+                dtype=self.storage,
+                scale=scale,
+                fidelity=fidelity,
+                ttl_seconds=ttl,
+                last_used_at=now,
+                expires_at=now + timedelta(seconds=ttl)
+            )
+
+    def get(self, session_id):
+        """
+        Return {'name', 'embedding'} for a session, or None if it is unknown.
+        Raises FaceSessionExpired if the session expired or was evicted.
+        The row is copied out of the shared memory map and the session is
+        re-checked afterwards, since another worker may evict it and reuse
+        its row in between; compact encodings are dequantized to float32.
+        """
+        from ..models import FaceEmbedding
+
+        try:
+            session_uuid = uuid.UUID(str(session_id))
+        except ValueError:
+            metrics.incr('face_sessions.misses')
+            return None
+
+        entry = FaceEmbedding.objects.filter(session_id=session_uuid).first()
+        if entry is None:
+            metrics.incr('face_sessions.misses')
+            return None
+
+        now = timezone.now()
+        if entry.status == 'active' and entry.expires_at <= now:
+            # Release the row as soon as an expired session is seen
+            if FaceEmbedding.objects.filter(pk=entry.pk, status='active').update(status='expired', row=None):
+                metrics.incr('face_sessions.expired')
+            entry.status = 'expired'
+
+        if entry.status != 'active':
+            metrics.incr('face_sessions.misses')
+            raise FaceSessionExpired(entry.status)
+
+        mapped = self._mapped_rows(entry.dtype, entry.row)
+        if mapped is None:
+            metrics.incr('face_sessions.misses')
+            return None
+
+        stored = np.array(mapped[entry.row])
+        # Eviction marks the entry before its row is rewritten, so if it still
+        # owns the row now, the copy above was taken before any reuse
+        current = FaceEmbedding.objects.filter(pk=entry.pk).values_list('status', 'row').first()
+        if current != ('active', entry.row):
+            metrics.incr('face_sessions.misses')
+            if current is None:
+                return None
+            raise FaceSessionExpired(current[0] if current[0] != 'active' else 'evicted')
+
+        metrics.incr('face_sessions.hits')
+        self._touch(entry, now)
+
+        return {
+            'name': entry.name,
+            'embedding': self.decode(stored, entry.dtype, entry.scale)
+        }
+
+    @classmethod
+    def encode(cls, vector, storage):
+        """
+        Normalize and encode a float32 embedding for a storage dtype.
+        Returns (stored_row, scale, cosine fidelity of the decoded row).
+        """
+        vector = vector / (np.linalg.norm(vector) + 1e-12)
+
+        if storage == 'int8':
+            # Symmetric per-vector scalar quantization
+            scale = float(np.abs(vector).max()) / 127.0 or 1.0
+            stored = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+        else:
+            scale = 1.0
+            stored = vector.astype(STORAGE_DTYPES[storage][0])
+
+        restored = cls.decode(stored, storage, scale)
+        fidelity = float(np.dot(vector, restored) / (np.linalg.norm(restored) + 1e-12))
+        return stored, scale, fidelity
+
+    @staticmethod
+    def decode(row, dtype, scale=1.0):
+        """Return a float32 embedding for a stored row (float32 rows are returned as is)"""
+        if dtype == 'float32':
+            return row
+        if dtype == 'int8':
+            return row.astype(np.float32) * np.float32(scale)
+        return row.astype(np.float32)
+
+    def unregister(self, session_id):
+        """
+        Remove a session and release its row. Returns True if it existed.
+        """
+        from ..models import FaceEmbedding
+
+        try:
+            session_uuid = uuid.UUID(str(session_id))
+        except ValueError:
+            return False
+
+        deleted, _ = FaceEmbedding.objects.filter(session_id=session_uuid).delete()
+        if deleted:
+            metrics.incr('face_sessions.unregistered')
+        return bool(deleted)
+
+    def active_count(self):
+        """Number of active sessions across all workers"""
+        from ..models import FaceEmbedding
+        return FaceEmbedding.objects.filter(status='active').count()
+
+    def stats(self):
+        """Capacity and usage of the store"""
+        active = self.active_count()
+        return {
+            'active_sessions': active,
+            'capacity': self.capacity,
+            'bytes_used': active * self.row_bytes,
+            'max_bytes': self.max_bytes,
+            'default_ttl_seconds': self.default_ttl,
+            'storage': self.storage_report()
+        }
+
+    def storage_report(self):
+        """
+        Memory/accuracy report for the configured dtype: bytes per identity,
+        identities that fit in FACE_SESSION_MAX_BYTES, and cosine fidelity of
+        the stored vectors against their float32 originals
+        """
+        from django.db.models import Avg, Min
+        from ..models import FaceEmbedding
+
+        fidelity = FaceEmbedding.objects.filter(status='active', dtype=self.storage).aggregate(
+            mean=Avg('fidelity'), worst=Min('fidelity')
+        )
+        float32_bytes = self.dim * np.dtype(np.float32).itemsize
+        return {
+            'dtype': self.storage,
+            'bytes_per_identity': self.row_bytes,
+            'compression_ratio': float32_bytes / self.row_bytes,
+            'identities_per_max_bytes': self.max_bytes // self.row_bytes,
+            'mean_cosine_fidelity': fidelity['mean'],
+            'min_cosine_fidelity': fidelity['worst']
+        }
+
+    @classmethod
+    def compare_storage_dtypes(cls, vectors):
+        """
+        Offline accuracy check: encode a (n, dim) sample of embeddings with
+        every dtype and report bytes per vector, cosine fidelity, and the
+        largest error in pairwise similarity scores
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+        reference_scores = vectors @ vectors.T
+
+        report = {}
+        for storage, (dtype, _) in STORAGE_DTYPES.items():
+            decoded = []
+            fidelities = []
+            for vector in vectors:
+                stored, scale, fidelity = cls.encode(vector, storage)
+                decoded.append(cls.decode(stored, storage, scale))
+                fidelities.append(fidelity)
+
+            decoded = np.stack(decoded)
+            decoded /= np.linalg.norm(decoded, axis=1, keepdims=True) + 1e-12
+            report[storage] = {
+                'bytes_per_vector': vectors.shape[1] * np.dtype(dtype).itemsize,
+                'mean_cosine_fidelity': float(np.mean(fidelities)),
+                'min_cosine_fidelity': float(np.min(fidelities)),
+                'max_similarity_error': float(np.abs(decoded @ vectors.T - reference_scores).max())
+            }
+
+        return report
+
+    def _clamp_ttl(self, ttl):
+        """Return a TTL in seconds within (0, max_ttl]"""
+        try:
+            ttl = int(ttl) if ttl is not None else self.default_ttl
+        except (TypeError, ValueError):
+            ttl = self.default_ttl
+        return max(1, min(ttl, self.max_ttl))
+
+    def _touch(self, entry, now):
+        """Slide the session TTL forward, at most once per touch interval"""
+        from ..models import FaceEmbedding
+
+        if (now - entry.last_used_at).total_seconds() < self.TOUCH_INTERVAL_SECONDS:
+            return
+        FaceEmbedding.objects.filter(pk=entry.pk, status='active').update(
+            last_used_at=now,
+            expires_at=now + timedelta(seconds=entry.ttl_seconds)
+        )
+
+    def _expire_stale(self, now):
+        """Mark sessions past their TTL as expired and drop old tombstones"""
+        from ..models import FaceEmbedding
+
+        expired = FaceEmbedding.objects.filter(status='active', expires_at__lte=now).update(status='expired', row=None)
+        if expired:
+            metrics.incr('face_sessions.expired', expired)
+
+        # Expired/evicted entries are only kept to answer 410 instead of 404
+        FaceEmbedding.objects.exclude(status='active').filter(
+            last_used_at__lt=now - timedelta(seconds=self.max_ttl)
+        ).delete()
+
+    def _evict_lru(self, keep):
+        """Evict least recently used sessions until at most `keep` remain active"""
+        from ..models import FaceEmbedding
+
+        active = FaceEmbedding.objects.filter(status='active')
+        excess = active.count() - keep
+        if excess <= 0:
+            return
+
+        victims = list(active.order_by('last_used_at').values_list('pk', flat=True)[:excess])
+        evicted = FaceEmbedding.objects.filter(pk__in=victims).update(status='evicted', row=None)
+        metrics.incr('face_sessions.evictions', evicted)
+
+    def _free_row(self, fd):
+        """Return the first row not used by an active session, growing the file if needed"""
+        from ..models import FaceEmbedding
+
+        size = os.lseek(fd, 0, os.SEEK_END)
+        file_rows = size // self.row_bytes
+        if size % self.row_bytes:
+            # Drop a partial row left behind by an interrupted writer
+            os.ftruncate(fd, file_rows * self.row_bytes)
+
+        used = set(FaceEmbedding.objects.filter(dtype=self.storage, row__isnull=False).values_list('row', flat=True))
+        for row in range(file_rows):
+            if row not in used:
+                return row
+        return file_rows
+
+    @contextmanager
+    def _exclusive(self):
+        """Open the embedding file with an exclusive lock across threads and worker processes"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with self._write_lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                yield fd
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+    def _path_for(self, storage):
+        """Embedding file for a dtype, e.g. face_embeddings.f32 / .f16 / .i8"""
+        base, _ = os.path.splitext(settings.FACE_EMBEDDING_STORE_PATH)
+        return base + STORAGE_DTYPES[storage][1]
+
+    def _mapped_rows(self, storage, row):
+        """Return a memory map of a dtype's file covering `row`, remapping only when the file has grown"""
+        with self._map_lock:
+            mapped, mapped_rows = self._maps.get(storage, (None, 0))
+            if mapped is None or row >= mapped_rows:
+                path = self._path_for(storage)
+                if not os.path.exists(path):
+                    return None
+
+                dtype = np.dtype(STORAGE_DTYPES[storage][0])
+                rows = os.path.getsize(path) // (self.dim * dtype.itemsize)
+                if row >= rows:
+                    return None
+
+                mapped = np.memmap(path, dtype=dtype, mode='r', shape=(rows, self.dim))
+                self._maps[storage] = (mapped, rows)
+
+            return mapped
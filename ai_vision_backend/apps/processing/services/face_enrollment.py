@@ -0,0 +1,183 @@
+import os
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import cv2
+import numpy as np
+from django.conf import settings
+from .facial_recognition_service import FacialRecognitionService
+from .face_embedding_store import FaceEmbeddingStore
+from .metrics import metrics
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+class FaceEnrollmentService:
+    """
+    Bulk face enrollment: extracts embeddings for many labelled images on a
+    worker pool and stores one normalized centroid per identity.
+    """
+
+    def __init__(self):
+        self.max_images = settings.FACE_ENROLL_MAX_IMAGES
+        self.max_bytes = settings.FACE_ENROLL_MAX_BYTES
+        self.workers = settings.FACE_ENROLL_WORKERS
+
+    def collect_from_archive(self, archive_file):
+        """
+        Read labelled images from a zip archive. The label is the folder the
+        image sits in (alice/1.jpg, or team/alice/1.jpg in a wrapped archive)
+        or, for files at the root, the file name without a trailing counter
+        (alice_1.jpg, alice-2.png).
+        Returns a list of (label, filename, bytes).
+        """
+        items = []
+        total_bytes = 0
+        with zipfile.ZipFile(archive_file) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+
+                filename = info.filename.replace('\\', '/')
+                parts = [p for p in filename.split('/') if p]
+                if not parts or parts[0] == '__MACOSX' or parts[-1].startswith('.'):
+                    continue
+                if os.path.splitext(parts[-1])[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+
+                # Check declared sizes before decompressing anything
+                total_bytes += info.file_size
+                if total_bytes > self.max_bytes:
+                    raise ValueError(f'Archive exceeds the {self.max_bytes // (1024 * 1024)}MB enrollment limit')
+                if len(items) >= self.max_images:
+                    raise ValueError(f'Archive contains more than {self.max_images} images')
+
+                label = parts[-2] if len(parts) > 1 else self._label_from_filename(parts[-1])
+                items.append((label, filename, archive.read(info)))
+
+        return items
+
+    def collect_from_files(self, uploaded_files, names):
+        """
+        Pair uploaded files with name labels (one name per file, or one name
+        for all files). Returns a list of (label, filename, bytes).
+        """
+        if len(uploaded_files) > self.max_images:
+            raise ValueError(f'At most {self.max_images} images can be enrolled at once')
+        if len(names) == 1:
+            names = names * len(uploaded_files)
+        if len(names) != len(uploaded_files):
+            raise ValueError('Provide one name per file, or a single name for all files')
+
+        items = []
+        total_bytes = 0
+        for uploaded_file, name in zip(uploaded_files, names):
+            total_bytes += uploaded_file.size
+            if total_bytes > self.max_bytes:
+                raise ValueError(f'Upload exceeds the {self.max_bytes // (1024 * 1024)}MB enrollment limit')
+            items.append((name.strip(), uploaded_file.name, uploaded_file.read()))
+
+        return items
+
+    def enroll(self, items, ttl=None):
+        """
+        Extract embeddings in parallel and register one centroid per identity.
+        Yields progress events as dicts: 'progress' per image, 'identity'
+        per stored identity, and a final 'done' summary. Errors raised once
+        events have been sent (the response has already started streaming)
+        end the stream with an 'error' event instead.
+        """
+        try:
+            yield from self._enroll(items, ttl)
+        except Exception as e:
+            print(f"Error enrolling faces: {e}")
+            metrics.incr('face_enrollment.errors')
+            yield {'type': 'error', 'error': str(e)}
+
+    def _enroll(self, items, ttl):
+        service = FacialRecognitionService(mode='recognition')
+        items = [item for item in items if item[0]]
+        total = len(items)
+        embeddings = {}
+        processed = 0
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self._extract, service, data): (label, filename)
+                for label, filename, data in items
+            }
+            for future in as_completed(futures):
+                label, filename = futures[future]
+                embedding, error = future.result()
+                processed += 1
+
+                if embedding is not None:
+                    embeddings.setdefault(label, []).append(embedding)
+                else:
+                    failed += 1
+
+                yield {
+                    'type': 'progress',
+                    'processed': processed,
+                    'total': total,
+                    'file': filename,
+                    'identity': label,
+                    'ok': embedding is not None,
+                    'error': error
+                }
+
+        store = FaceEmbeddingStore()
+        enrolled = []
+        for label, vectors in embeddings.items():
+            entry = store.add(label[:100], self.centroid(vectors), ttl=ttl)
+            enrolled.append(label)
+            yield {
+                'type': 'identity',
+                'name': label,
+                'session_id': str(entry.session_id),
+                'images_used': len(vectors),
+                'expires_at': entry.expires_at.isoformat()
+            }
+
+        metrics.incr('face_enrollment.images', processed)
+        metrics.incr('face_enrollment.failed_images', failed)
+        metrics.incr('face_enrollment.identities', len(enrolled))
+
+        yield {
+            'type': 'done',
+            'total_images': total,
+            'processed_images': processed,
+            'failed_images': failed,
+            'identities_enrolled': len(enrolled)
+        }
+
+    @staticmethod
+    def centroid(vectors):
+        """Average L2-normalized embeddings and normalize the result"""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        mean = matrix.mean(axis=0)
+        return mean / (np.linalg.norm(mean) + 1e-12)
+
+    @staticmethod
+    def _extract(service, data):
+        """Decode one image and return (embedding, error)"""
+        try:
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                return None, 'Failed to decode image'
+
+            analysis = service.analyze_array(img)
+            if analysis.primary_face is None:
+                return None, 'No face detected'
+            return analysis.primary_face.embedding, None
+
+        except Exception as e:
+            print(f"Error extracting enrollment embedding: {e}")
+            return None, str(e)
+
+    @staticmethod
+    def _label_from_filename(filename):
+        stem = os.path.splitext(filename)[0]
+        return re.sub(r'[\s_\-]*\(?\d+\)?$', '', stem).strip() or stem
@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from django.conf import settings
+from .frame_similarity import FrameSkipper
+
+
+def bbox_iou(box_a, box_b):
+    """Intersection over union of two [x1, y1, x2, y2] boxes"""
+    x1 = max(box_a[0], box_b[0])
+    y1 = max(box_a[1], box_b[1])
+    x2 = min(box_a[2], box_b[2])
+    y2 = min(box_a[3], box_b[3])
+
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    if inter <= 0:
+        return 0.0
+
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return float(inter / (area_a + area_b - inter))
+
+
+class FaceTrack:
+    """A face followed across frames, with the last recognition result"""
+
+    def __init__(self, track_id, bbox, now):
+        self.track_id = track_id
+        self.bbox = np.asarray(bbox, dtype=np.float32)
+        self.embedded_bbox = self.bbox
+        self.last_seen = now
+        self.refreshed_at = None
+        self.similarity = 0.0
+        self.is_match = False
+
+    def needs_refresh(self, bbox, now, refresh_seconds, reembed_iou):
+        """True if the identity must be re-computed from a fresh embedding"""
+        if self.refreshed_at is None:
+            return True
+        if now - self.refreshed_at >= refresh_seconds:
+            return True
+        # Box moved or resized a lot since the last embedding (new pose/person)
+        return bbox_iou(self.embedded_bbox, bbox) < reembed_iou
+
+    def set_identity(self, bbox, similarity, is_match, now):
+        self.embedded_bbox = np.asarray(bbox, dtype=np.float32)
+        self.similarity = float(similarity)
+        self.is_match = bool(is_match)
+        self.refreshed_at = now
+
+
+class FaceTracker:
+    """
+    Per-session face tracker.
+
+    Detections are associated with existing tracks by IoU so identity and
+    similarity can be reused until the refresh interval passes or the box
+    changes too much, and only those faces need a new embedding.
+    """
+
+    def __init__(self, iou_threshold=None, refresh_seconds=None, reembed_iou=None, max_missed_seconds=1.0):
+        self.iou_threshold = iou_threshold if iou_threshold is not None else settings.FACE_TRACK_IOU_THRESHOLD
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else settings.FACE_TRACK_REFRESH_SECONDS
+        self.reembed_iou = reembed_iou if reembed_iou is not None else settings.FACE_TRACK_REEMBED_IOU
+        self.max_missed_seconds = max_missed_seconds
+        self.tracks = []
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.last_face_count = None
+        self.skipper = FrameSkipper('face_frames')
+        self._next_id = 1
+
+    def associate(self, bboxes, now=None):
+        """
+        Match detections to tracks greedily by IoU.
+        Returns a list of (track, needs_refresh), one per detection, in order.
+        """
+        now = now if now is not None else time.monotonic()
+        self.last_used = now
+        self.last_face_count = len(bboxes)
+
+        # Drop tracks that have not been seen for a while
+        self.tracks = [t for t in self.tracks if now - t.last_seen <= self.max_missed_seconds]
+
+        candidates = []
+        for det_idx, bbox in enumerate(bboxes):
+            for track_idx, track in enumerate(self.tracks):
+                iou = bbox_iou(track.bbox, bbox)
+                if iou >= self.iou_threshold:
+                    candidates.append((iou, det_idx, track_idx))
+        candidates.sort(reverse=True)
+
+        assigned = {}
+        used_tracks = set()
+        for iou, det_idx, track_idx in candidates:
+            if det_idx in assigned or track_idx in used_tracks:
+                continue
+            assigned[det_idx] = self.tracks[track_idx]
+            used_tracks.add(track_idx)
+
+        results = []
+        for det_idx, bbox in enumerate(bboxes):
+            track = assigned.get(det_idx)
+            if track is None:
+                track = FaceTrack(self._next_id, bbox, now)
+                self._next_id += 1
+                self.tracks.append(track)
+
+            needs_refresh = track.needs_refresh(bbox, now, self.refresh_seconds, self.reembed_iou)
+            track.bbox = np.asarray(bbox, dtype=np.float32)
+            track.last_seen = now
+            results.append((track, needs_refresh))
+
+        return results
+
+    def touch(self, faces, now=None):
+        """
+        Mark the tracks behind a reused result as seen, so a still scene
+        served by the frame skipper does not age its faces out.
+        """
+        now = now if now is not None else time.monotonic()
+        self.last_used = now
+        track_ids = {face['track_id'] for face in faces if 'track_id' in face}
+        for track in self.tracks:
+            if track.track_id in track_ids:
+                track.last_seen = now
+
+
+class FaceTrackerRegistry:
+    """Process-wide trackers keyed by session id, with idle and count eviction"""
+
+    def __init__(self, max_sessions=256, idle_seconds=60):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._trackers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Return the tracker for a session, creating it if needed"""
+        now = time.monotonic()
+        with self._lock:
+            tracker = self._trackers.pop(session_id, None)
+            if tracker is None:
+                tracker = FaceTracker()
+            self._trackers[session_id] = tracker
+
+            # Evict idle trackers and keep the registry bounded (oldest first)
+            while self._trackers:
+                oldest_id, oldest = next(iter(self._trackers.items()))
+                if oldest_id == session_id:
+                    break
+                if len(self._trackers) <= self.max_sessions and now - oldest.last_used <= self.idle_seconds:
+                    break
+                self._trackers.popitem(last=False)
+
+            return tracker
+
+    def discard(self, session_id):
+        with self._lock:
+            self._trackers.pop(session_id, None)
+
+
+face_trackers = FaceTrackerRegistry()
@@ -2,57 +2,246 @@ import insightface
 import cv2
 import numpy as np
 from PIL import Image
-import os
 from pathlib import Path
-import google.generativeai as genai
-import base64
 import io
+import threading
+import time
+from django.conf import settings
+from .metrics import metrics
+from .frame_decoding import decode_frame
+from .llm_client import LLMClientManager, LLMUnavailable
+from .description_worker import DescriptionWorker
+
+# InsightFace task modules loaded for each analysis mode (None loads the whole pack).
+# 'detection' gives boxes and scores only; 'recognition' adds the 512-d embedding.
+FACE_ANALYSIS_MODES = {
+    'detection': ['detection'],
+    'recognition': ['detection', 'recognition'],
+    'full': None
+}
+
+# Detector input sizes, chosen per call. Small inputs suit low-resolution or
+# single-face webcam streams; large inputs keep small faces in group photos.
+DET_SIZE_PRESETS = {
+    'small': (320, 320),
+    'medium': (480, 480),
+    'large': (640, 640)
+}
+
+class FaceAnalysisResult:
+    """
+    Output of a single face pipeline pass over one image. Recognition,
+    drawing and description steps read from it instead of re-running inference.
+    """
+
+    def __init__(self, image, faces, inference_ms=0.0, mode=None, det_size=None):
+        self.image = image
+        self.faces = faces
+        self.inference_ms = inference_ms
+        self.mode = mode
+        self.det_size = det_size
+
+    @property
+    def primary_face(self):
+        """First detected face, or None"""
+        return self.faces[0] if self.faces else None
+
+    @property
+    def scores(self):
+        return [float(face.det_score) for face in self.faces]
+
+    @property
+    def embeddings(self):
+        """(faces, 512) array of embeddings, or None if the mode has no recognition"""
+        if not self.faces or getattr(self.faces[0], 'embedding', None) is None:
+            return None
+        return np.stack([face.embedding for face in self.faces])
+
+    def to_list(self):
+        """JSON-friendly summary of every face"""
+        return [
+            {
+                'bbox': face.bbox.astype(int).tolist(),
+                'det_score': float(face.det_score)
+            }
+            for face in self.faces
+        ]
 
 class FacialRecognitionService:
-    def __init__(self):
-        # Initialize InsightFace model
-        self.model = insightface.app.FaceAnalysis(name='buffalo_l')
-        self.model.prepare(ctx_id=0, det_size=(640, 640))
+    # Prepared InsightFace pipelines shared by all instances, one per mode
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, mode='recognition'):
+        if mode not in FACE_ANALYSIS_MODES:
+            raise ValueError(f"Unknown face analysis mode: {mode}")
+
+        # Initialize InsightFace model with only the modules this mode needs
+        self.mode = mode
+        self.model = self._get_model(mode)
+        self.last_inference_ms = 0.0
+        self.last_det_size = 'large'
+
+    @classmethod
+    def _get_model(cls, mode):
+        """Load and prepare the InsightFace pipeline for a mode once per process"""
+        if mode not in cls._models:
+            with cls._models_lock:
+                if mode not in cls._models:
+                    model = insightface.app.FaceAnalysis(name='buffalo_l', allowed_modules=FACE_ANALYSIS_MODES[mode])
+                    model.prepare(ctx_id=0, det_size=DET_SIZE_PRESETS['large'])
+                    cls._warm_up_detector(model)
+                    print(f"InsightFace '{mode}' pipeline loaded with modules: {sorted(model.models.keys())}")
+                    cls._models[mode] = model
+        return cls._models[mode]
+
+    @staticmethod
+    def _warm_up_detector(model):
+        """Build the detector's anchor grids for every preset size up front"""
+        for size in DET_SIZE_PRESETS.values():
+            try:
+                model.det_model.detect(np.zeros((size[1], size[0], 3), dtype=np.uint8), input_size=size)
+            except Exception as e:
+                print(f"Detector warm-up failed for {size}: {e}")
+
+    def choose_det_size(self, frame, expected_faces=None):
+        """
+        Pick a detector preset for a frame from its resolution and, for
+        webcam sessions, the number of faces seen in the previous frame
+        """
+        longest_side = max(frame.shape[:2])
+
+        if longest_side <= 360:
+            return 'small'
+        if expected_faces is not None and expected_faces >= 3:
+            return 'large'  # Group shot: keep small faces detectable
+        if expected_faces is not None and expected_faces <= 1:
+            return 'small' if longest_side <= 720 else 'medium'
+        return 'medium' if longest_side <= 720 else 'large'
 
-        # Configure Gemini API
-        genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+    def _analyze(self, img, det_size='large'):
+        """Run the face pipeline at a detector preset and record its latency per mode"""
+        from insightface.app.common import Face
 
-    def process_face(self, image_path, name):
+        start = time.perf_counter()
+        # Same steps as FaceAnalysis.get, with a per-call detector input size
+        bboxes, kpss = self.model.det_model.detect(img, input_size=DET_SIZE_PRESETS[det_size], max_num=0, metric='default')
+        faces = []
+        for i in range(bboxes.shape[0]):
+            face = Face(bbox=bboxes[i, 0:4], kps=kpss[i] if kpss is not None else None, det_score=bboxes[i, 4])
+            for taskname, module in self.model.models.items():
+                if taskname == 'detection':
+                    continue
+                module.get(img, face)
+            faces.append(face)
+
+        self.last_inference_ms = (time.perf_counter() - start) * 1000
+        self.last_det_size = det_size
+        metrics.observe(f'face_analysis.{self.mode}.inference_ms', self.last_inference_ms)
+        metrics.observe(f'face_analysis.det_{det_size}.inference_ms', self.last_inference_ms)
+        return faces
+
+    def get_timing(self, skipped=False):
+        """
+        Latency of the last inference along with the modules that ran.
+        For a skipped (duplicate) frame no inference ran, and that is reported
+        instead of the previous frame's figures.
+        """
+        if skipped:
+            return {
+                'analysis_mode': self.mode,
+                'modules': [],
+                'det_size': None,
+                'inference_ms': 0.0,
+                'skipped': True
+            }
+        return {
+            'analysis_mode': self.mode,
+            'modules': sorted(self.model.models.keys()),
+            'det_size': list(DET_SIZE_PRESETS[self.last_det_size]),
+            'inference_ms': round(self.last_inference_ms, 2),
+            'skipped': False
+        }
+
+    def analyze_image(self, image_path, det_size='large'):
+        """
+        Read an image once and run a single face pipeline pass over it
+        """
+        img = cv2.imread(image_path)
+        if img is None:
+            return FaceAnalysisResult(None, [], mode=self.mode, det_size=det_size)
+
+        return self.analyze_array(img, det_size=det_size)
+
+    def analyze_array(self, img, det_size='large'):
         """
-        Process face image and return recognition results
+        Run a single face pipeline pass over a decoded BGR image
+        """
+        start = time.perf_counter()
+        faces = self._analyze(img, det_size=det_size)
+        inference_ms = (time.perf_counter() - start) * 1000
+        return FaceAnalysisResult(img, faces, inference_ms, self.mode, det_size)
+
+    def process_face(self, image_path, name, analysis=None, async_description=False):
+        """
+        Process face image and return recognition results.
+        Pass a FaceAnalysisResult to reuse an existing detection pass.
+        With async_description the Gemini description is generated in the
+        background and only its description_id is returned.
         """
         try:
             # Load and process image
-            img = cv2.imread(image_path)
-            faces = self.model.get(img)
+            if analysis is None:
+                analysis = self.analyze_image(image_path)
+            img = analysis.image
+            faces = analysis.faces
+
+            if img is None:
+                return {
+                    'recognized': False,
+                    'confidence': 0.0,
+                    'faces': [],
+                    'ai_description': 'Failed to load image.',
+                    'technical_summary': 'Image loading failed.'
+                }
 
             if not faces:
                 return {
                     'recognized': False,
                     'confidence': 0.0,
+                    'faces': [],
                     'ai_description': 'No face detected in the image.',
                     'technical_summary': 'Face detection failed - no faces found.'
                 }
 
             # For demo purposes, assume recognition if face is detected
             # In production, you'd compare against a database of known faces
-            face = faces[0]  # Take the first face
+            face = analysis.primary_face  # Take the first face
             confidence = float(face.det_score)
 
-            # Generate AI description using Gemini
-            ai_description = self._generate_ai_description(img, name, confidence)
-
-            return {
+            result = {
                 'recognized': confidence > 0.5,  # Threshold for recognition
                 'confidence': confidence,
-                'ai_description': ai_description,
-                'technical_summary': f'Detected face with confidence {confidence:.2f}. Facial features extracted successfully.'
+                'faces': analysis.to_list(),
+                'technical_summary': f'Detected {len(faces)} face(s), primary face confidence {confidence:.2f}. Facial features extracted successfully.'
             }
 
+            # Generate AI description using Gemini
+            if async_description:
+                result['ai_description'] = None
+                result['description_id'] = DescriptionWorker().submit(
+                    'facial_recognition', self._generate_ai_description, img, name, confidence
+                )
+            else:
+                result['ai_description'] = self._generate_ai_description(img, name, confidence)
+
+            return result
+
         except Exception as e:
             return {
                 'recognized': False,
                 'confidence': 0.0,
+                'faces': [],
                 'ai_description': f'Error processing image: {str(e)}',
                 'technical_summary': f'Processing failed: {str(e)}'
             }
@@ -64,7 +253,7 @@ class FacialRecognitionService:
         try:
             # Convert image to base64 for Gemini
             pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-            model = genai.GenerativeModel('gemini-pro-vision')
+            model = LLMClientManager().model(settings.LLM_DESCRIPTION_MODEL)
 
             prompt = f"""
             Analyze this facial image of {name}. Provide a detailed description including:
@@ -81,17 +270,24 @@ class FacialRecognitionService:
             response = model.generate_content([prompt, pil_image])
             return response.text
 
+        except LLMUnavailable:
+            return f"Detected the face of {name} with {confidence:.2f} confidence. A detailed AI description is temporarily unavailable."
+
         except Exception as e:
             return f"AI analysis failed: {str(e)}"
 
-    def draw_face_box(self, image_path, output_path):
+    def draw_face_box(self, image_path, output_path, analysis=None):
         """
-        Draw bounding box around detected face
+        Draw bounding box around detected face.
+        Pass a FaceAnalysisResult to draw its faces without running inference again.
         """
-        img = cv2.imread(image_path)
-        faces = self.model.get(img)
+        if analysis is None:
+            analysis = self.analyze_image(image_path)
+        if analysis.image is None:
+            return None
 
-        for face in faces:
+        img = analysis.image.copy()
+        for face in analysis.faces:
             bbox = face.bbox.astype(int)
             cv2.rectangle(img, (bbox[0], bbox[1]), (bbox[2], bbox[3]), (0, 255, 0), 2)
 
@@ -103,16 +299,12 @@ class FacialRecognitionService:
         Extract 512-dimensional face embedding vector from reference image
         """
         try:
-            img = cv2.imread(image_path)
-            if img is None:
-                return None
-            
-            faces = self.model.get(img)
-            if not faces:
+            analysis = self.analyze_image(image_path)
+            if analysis.primary_face is None:
                 return None
             
             # Return the embedding of the first detected face
-            return faces[0].embedding
+            return analysis.primary_face.embedding
             
         except Exception as e:
             print(f"Error extracting embedding: {e}")
@@ -136,36 +328,43 @@ class FacialRecognitionService:
             print(f"Error comparing faces: {e}")
             return 0.0, False
 
-    def process_webcam_frame(self, frame_base64, reference_embedding, person_name):
+    def process_webcam_frame(self, frame_data, reference_embedding, person_name, tracker=None, det_size=None):
         """
-        Process webcam frame and return all detected faces with recognition status
+        Process webcam frame and return all detected faces with recognition status.
+        With a FaceTracker, faces whose track is still fresh reuse the previous
+        identity and only the detector runs for them. The detector preset is
+        chosen per frame unless det_size is given. frame_data is encoded image
+        bytes or base64 text. A frame nearly identical to the tracker's last
+        inferred frame returns that frame's faces without running inference.
         """
         try:
-            # Decode base64 frame
-            frame_data = base64.b64decode(frame_base64)
-            frame_array = np.frombuffer(frame_data, dtype=np.uint8)
-            frame = cv2.imdecode(frame_array, cv2.IMREAD_COLOR)
+            frame = decode_frame(frame_data)
             
             if frame is None:
                 return {'faces': [], 'error': 'Failed to decode frame'}
+
+            if tracker is not None:
+                with tracker.lock:
+                    previous = tracker.skipper.lookup(frame)
+                    if previous is not None:
+                        tracker.touch(previous)
+                if previous is not None:
+                    return {'faces': previous, 'error': None, 'skipped': True}
             
-            # Detect all faces in the frame
-            faces = self.model.get(frame)
-            
-            if not faces:
-                return {'faces': [], 'error': None}
+            if det_size not in DET_SIZE_PRESETS:
+                expected_faces = tracker.last_face_count if tracker is not None else None
+                det_size = self.choose_det_size(frame, expected_faces)
+
+            if tracker is not None and 'recognition' in self.model.models:
+                matches = self._match_tracked_faces(frame, reference_embedding, tracker, det_size)
+            else:
+                matches = self._match_faces(frame, reference_embedding, det_size)
             
             # Process each detected face
             face_results = []
-            for face in faces:
-                # Extract embedding for this face
-                face_embedding = face.embedding
-                
-                # Compare with reference embedding
-                similarity, is_match = self.compare_faces(reference_embedding, face_embedding)
-                
-                # Get bounding box coordinates
-                bbox = face.bbox.astype(int).tolist()
+            for match in matches:
+                similarity = match['similarity']
+                is_match = match['is_match']
                 
                 # Determine name and confidence
                 if is_match:
@@ -173,18 +372,82 @@ class FacialRecognitionService:
                     confidence = similarity
                 else:
                     name = "Unknown"
-                    confidence = face.det_score  # Use detection confidence for unknown faces
+                    confidence = match['det_score']  # Use detection confidence for unknown faces
                 
-                face_results.append({
-                    'bbox': bbox,
+                result = {
+                    'bbox': match['bbox'],
                     'name': name,
                     'confidence': float(confidence),
                     'is_match': is_match,
                     'similarity': float(similarity)
-                })
+                }
+                if 'track_id' in match:
+                    result['track_id'] = match['track_id']
+                    result['tracked'] = match['tracked']
+                face_results.append(result)
+
+            if tracker is not None:
+                with tracker.lock:
+                    tracker.skipper.store(face_results)
             
-            return {'faces': face_results, 'error': None}
+            return {'faces': face_results, 'error': None, 'skipped': False}
             
         except Exception as e:
             print(f"Error processing webcam frame: {e}")
             return {'faces': [], 'error': str(e)}
+
+    def _match_faces(self, frame, reference_embedding, det_size='large'):
+        """Run the full pipeline and compare every face against the reference"""
+        matches = []
+        for face in self._analyze(frame, det_size=det_size):
+            similarity, is_match = self.compare_faces(reference_embedding, face.embedding)
+            matches.append({
+                'bbox': face.bbox.astype(int).tolist(),
+                'det_score': float(face.det_score),
+                'similarity': similarity,
+                'is_match': bool(is_match)
+            })
+        return matches
+
+    def _match_tracked_faces(self, frame, reference_embedding, tracker, det_size='large'):
+        """
+        Detector-only pass; embeddings are extracted only for new tracks,
+        tracks past their refresh interval, or boxes that changed a lot
+        """
+        from insightface.app.common import Face
+
+        start = time.perf_counter()
+        bboxes, kpss = self.model.det_model.detect(frame, input_size=DET_SIZE_PRESETS[det_size], max_num=0, metric='default')
+        recognition_model = self.model.models['recognition']
+
+        matches = []
+        embedded = 0
+        with tracker.lock:
+            associations = tracker.associate([bbox[:4] for bbox in bboxes])
+            for i, (track, needs_refresh) in enumerate(associations):
+                bbox = bboxes[i, 0:4]
+                det_score = float(bboxes[i, 4])
+
+                if needs_refresh:
+                    face = Face(bbox=bbox, kps=kpss[i] if kpss is not None else None, det_score=det_score)
+                    recognition_model.get(frame, face)
+                    similarity, is_match = self.compare_faces(reference_embedding, face.embedding)
+                    track.set_identity(bbox, similarity, is_match, time.monotonic())
+                    embedded += 1
+
+                matches.append({
+                    'bbox': bbox.astype(int).tolist(),
+                    'det_score': det_score,
+                    'similarity': track.similarity,
+                    'is_match': track.is_match,
+                    'track_id': track.track_id,
+                    'tracked': not needs_refresh
+                })
+
+        self.last_inference_ms = (time.perf_counter() - start) * 1000
+        self.last_det_size = det_size
+        metrics.observe(f'face_analysis.{self.mode}.tracked_inference_ms', self.last_inference_ms)
+        metrics.observe(f'face_analysis.det_{det_size}.inference_ms', self.last_inference_ms)
+        metrics.incr('face_tracking.embeddings_computed', embedded)
+        metrics.incr('face_tracking.embeddings_reused', len(matches) - embedded)
+        return matches
@@ -0,0 +1,138 @@
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from .metrics import metrics
+
+# Capture resolutions offered to clients, largest first
+RECOMMENDED_RESOLUTIONS = [(640, 480), (480, 360), (320, 240)]
+
+
+class FrameDropped(Exception):
+    """Raised when a waiting frame is superseded by a newer one or waits too long"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _AdmissionSlot:
+    def __init__(self):
+        self.busy = False
+        self.waiting = None
+        self.next_ticket = 0
+        self.avg_ms = None
+        self.last_used = time.monotonic()
+
+
+class FrameAdmission:
+    """
+    Per-session admission control for realtime frame endpoints.
+
+    One frame per session is processed at a time and at most one more waits.
+    When a newer frame arrives the waiting one is answered as dropped, so a
+    client that sends faster than we infer always gets its latest frame
+    processed next instead of a growing backlog. Processing time is tracked
+    per session to recommend a frame rate and resolution.
+    """
+
+    def __init__(self, name, wait_seconds=None, idle_seconds=60):
+        self.name = name
+        self.wait_seconds = wait_seconds if wait_seconds is not None else settings.REALTIME_ADMISSION_WAIT_SECONDS
+        self.idle_seconds = idle_seconds
+        self._slots = {}
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def admit(self, session_id):
+        """Hold the session's processing turn for one frame, or raise FrameDropped"""
+        slot = self._acquire(session_id)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._cond:
+                slot.busy = False
+                slot.last_used = time.monotonic()
+                # Exponential moving average, so recommendations follow load changes
+                slot.avg_ms = elapsed_ms if slot.avg_ms is None else 0.8 * slot.avg_ms + 0.2 * elapsed_ms
+                self._cond.notify_all()
+
+    def recommendation(self, session_id):
+        """Frame rate and resolution the client can sustain at the measured processing time"""
+        with self._cond:
+            slot = self._slots.get(session_id)
+            avg_ms = slot.avg_ms if slot is not None else None
+
+        max_fps = settings.REALTIME_MAX_FPS
+        if not avg_ms:
+            width, height = RECOMMENDED_RESOLUTIONS[0]
+            return {'fps': max_fps, 'width': width, 'height': height, 'processing_ms': None}
+
+        # Load factor at the target frame rate; smaller frames cost roughly their pixel share
+        load = avg_ms * settings.REALTIME_TARGET_FPS / 1000
+        base_pixels = RECOMMENDED_RESOLUTIONS[0][0] * RECOMMENDED_RESOLUTIONS[0][1]
+        width, height = RECOMMENDED_RESOLUTIONS[-1]
+        for candidate in RECOMMENDED_RESOLUTIONS:
+            if load * candidate[0] * candidate[1] / base_pixels <= 1.0:
+                width, height = candidate
+                break
+
+        return {
+            'fps': max(1, min(max_fps, int(1000 / avg_ms))),
+            'width': width,
+            'height': height,
+            'processing_ms': round(avg_ms, 1)
+        }
+
+    def _acquire(self, session_id):
+        deadline = time.monotonic() + self.wait_seconds
+        with self._cond:
+            self._prune()
+            slot = self._slots.get(session_id)
+            if slot is None:
+                slot = self._slots[session_id] = _AdmissionSlot()
+            slot.last_used = time.monotonic()
+
+            if not slot.busy and slot.waiting is None:
+                slot.busy = True
+                return slot
+
+            # Take over the waiting position; the previous waiter is dropped
+            ticket = slot.next_ticket
+            slot.next_ticket += 1
+            if slot.waiting is not None:
+                self._cond.notify_all()
+            slot.waiting = ticket
+
+            while slot.busy and slot.waiting == ticket:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            if slot.waiting != ticket:
+                metrics.incr(f'{self.name}.frames_superseded')
+                raise FrameDropped('superseded')
+            if slot.busy:
+                slot.waiting = None
+                metrics.incr(f'{self.name}.frames_timed_out')
+                raise FrameDropped('timeout')
+
+            slot.waiting = None
+            slot.busy = True
+            return slot
+
+    def _prune(self):
+        now = time.monotonic()
+        idle = [
+            key for key, slot in self._slots.items()
+            if not slot.busy and slot.waiting is None and now - slot.last_used > self.idle_seconds
+        ]
+        for key in idle:
+            del self._slots[key]
+
+
+face_frame_admission = FrameAdmission('face_frames')
+gesture_frame_admission = FrameAdmission('gesture_frames')
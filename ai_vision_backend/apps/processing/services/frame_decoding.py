@@ -0,0 +1,44 @@
+import base64
+import cv2
+import numpy as np
+from .metrics import metrics
+
+# Request content types carrying one encoded image as the raw body
+RAW_FRAME_CONTENT_TYPES = ('image/jpeg', 'image/webp', 'image/png', 'application/octet-stream')
+
+
+def decode_frame(frame):
+    """
+    Decode a webcam frame to a BGR image, or None if it cannot be decoded.
+    Accepts encoded image bytes (bytes, bytearray, memoryview) as sent in a
+    binary body or multipart file, or the legacy base64 text field.
+    """
+    if isinstance(frame, str):
+        metrics.incr('frames.base64')
+        frame = base64.b64decode(frame)
+    else:
+        metrics.incr('frames.binary')
+
+    # No copy: imdecode reads straight from the request buffer
+    frame_array = np.frombuffer(frame, dtype=np.uint8)
+    if not frame_array.size:
+        return None
+    return cv2.imdecode(frame_array, cv2.IMREAD_COLOR)
+
+
+def read_frame_request(request):
+    """
+    Extract (frame, params) from a frame upload request.
+
+    A raw JPEG/WebP/PNG body is returned as bytes with its options taken from
+    the query string. For form posts the frame is a multipart 'frame' file
+    (bytes) or the base64 'frame' field, and options come from the form.
+    """
+    content_type = (request.content_type or '').split(';')[0].strip().lower()
+    if content_type in RAW_FRAME_CONTENT_TYPES:
+        return request.body, request.query_params
+
+    uploaded = request.FILES.get('frame')
+    if uploaded is not None:
+        return uploaded.read(), request.POST
+    return request.POST.get('frame'), request.POST
@@ -0,0 +1,67 @@
+import time
+from functools import partial
+import cv2
+import numpy as np
+from django.conf import settings
+from .metrics import metrics
+
+SIGNATURE_SIZE = 16
+
+
+def frame_signature(frame):
+    """Tiny grayscale thumbnail used to compare consecutive frames"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+class FrameSkipper:
+    """
+    Per-session duplicate-frame check in front of inference.
+
+    A frame whose downsampled thumbnail differs from the last inferred frame
+    by less than `threshold` grey levels on average reuses that frame's
+    result. Comparing against the last inferred frame (not the previous
+    frame) means slow drift still triggers inference, and results older
+    than `max_age` seconds are always refreshed.
+    """
+
+    def __init__(self, name, threshold=None, max_age=None):
+        self.name = name
+        self.threshold = threshold if threshold is not None else settings.FRAME_SKIP_THRESHOLD
+        self.max_age = max_age if max_age is not None else settings.FRAME_SKIP_MAX_AGE_SECONDS
+        self.signature = None
+        self.result = None
+        self.inferred_at = 0.0
+        self._pending = None
+
+    def lookup(self, frame):
+        """Return the previous result if the frame is unchanged, else None (inference needed)"""
+        signature = frame_signature(frame) if self.threshold > 0 else None
+        if (signature is not None and self.result is not None and
+                time.monotonic() - self.inferred_at < self.max_age and
+                np.abs(signature - self.signature).mean() < self.threshold):
+            metrics.incr(f'{self.name}.frames_skipped')
+            return self.result
+
+        self._pending = signature
+        metrics.incr(f'{self.name}.frames_inferred')
+        return None
+
+    def store(self, result):
+        """Remember the result of the frame passed to the last lookup that missed"""
+        if self._pending is None:
+            return
+        self.signature = self._pending
+        self.result = result
+        self.inferred_at = time.monotonic()
+        self._pending = None
+
+
+def _skip_rate(name):
+    skipped = metrics.get(f'{name}.frames_skipped')
+    total = skipped + metrics.get(f'{name}.frames_inferred')
+    return round(skipped / total, 3) if total else 0.0
+
+
+for _name in ('face_frames', 'gesture_frames'):
+    metrics.register_gauge(f'{_name}.skip_rate', partial(_skip_rate, _name))
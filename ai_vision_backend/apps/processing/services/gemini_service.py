@@ -1,47 +1,47 @@
-import google.generativeai as genai  # pyright: ignore[reportMissingImports]
-import os
+import json
 from django.conf import settings  # pyright: ignore[reportMissingImports]
+from .llm_client import LLMClientManager
+from .description_cache import DescriptionCache
+
+# Bump when the description prompts change, so cached texts are not reused
+DESCRIPTION_PROMPT_VERSION = 2
+DESCRIPTION_CONFIDENCE_BUCKET = 0.1
 
 class GeminiService:
     def __init__(self):
-        # Initialize Gemini API
-        from django.conf import settings
-        api_key = getattr(settings, 'GEMINI_API_KEY', None) or os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY is required in Django settings or environment variables")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-pro')
+        # Shared, already-configured model handle
+        self.model = LLMClientManager().model(settings.LLM_DESCRIPTION_MODEL)
     
     def generate_description(self, detections, image_type="object detection"):
         """
-        Generate a natural language description of the AI vision results
+        Generate a natural language description of the AI vision results.
+        Prompts are built from a normalized summary (class counts with
+        bucketed confidences), so near-identical results share one cached
+        description.
         """
         try:
-            if image_type == "object_detection":
-                if not detections or len(detections) == 0:
+            if image_type in ("object_detection", "image_segmentation") and not detections:
+                if image_type == "object_detection":
                     return "No objects were detected in the image."
-                
+                return "No objects were segmented in the image."
+
+            summary = self._summarize(detections, image_type)
+            cache = DescriptionCache()
+            cache_key = cache.make_key(f'{self.model.name}/{image_type}', summary, DESCRIPTION_PROMPT_VERSION)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            if image_type == "object_detection":
                 # Check if this is video data (has frame information)
                 has_frames = any('frame' in detection for detection in detections)
                 
                 if has_frames:
                     # Video processing
-                    frame_counts = {}
-                    for detection in detections:
-                        frame = detection.get('frame', 0)
-                        class_name = detection.get('class', 'unknown object')
-                        if class_name not in frame_counts:
-                            frame_counts[class_name] = set()
-                        frame_counts[class_name].add(frame)
-                    
-                    # Format video description
-                    objects_text = []
-                    for class_name, frames in frame_counts.items():
-                        frame_count = len(frames)
-                        objects_text.append(f"{class_name} (detected in {frame_count} frames)")
-                    
-                    objects_text = ", ".join(objects_text)
+                    objects_text = ", ".join(
+                        f"{class_name} (detected in {frame_count} frames)"
+                        for class_name, frame_count in summary
+                    )
                     
                     prompt = f"""
                     Based on the following video object detection results, provide a natural, engaging description of what was found in the video:
@@ -52,13 +52,10 @@ class GeminiService:
                     """
                 else:
                     # Image processing
-                    objects = []
-                    for detection in detections:
-                        confidence = detection.get('confidence', 0)
-                        class_name = detection.get('class', 'unknown object')
-                        objects.append(f"{class_name} ({confidence:.1%} confidence)")
-                    
-                    objects_text = ", ".join(objects)
+                    objects_text = ", ".join(
+                        f"{count} x {class_name} ({self._bucket_text(bucket)} confidence)"
+                        for class_name, bucket, count in summary
+                    )
                     
                     prompt = f"""
                     Based on the following object detection results from a YOLOv8 computer vision model, provide a natural, engaging description of what was found in the image:
@@ -91,18 +88,11 @@ class GeminiService:
                 """
                 
             elif image_type == "image_segmentation":
-                if not detections or len(detections) == 0:
-                    return "No objects were segmented in the image."
-                
                 # Format segmentation results
-                segments = []
-                for segment in detections:
-                    label = segment.get('label', 'unknown object')
-                    confidence = segment.get('confidence', 0)
-                    area = segment.get('area', 0)
-                    segments.append(f"{label} (confidence: {confidence:.1%}, area: {area} pixels)")
-                
-                segments_text = ", ".join(segments)
+                segments_text = ", ".join(
+                    f"{count} x {label} (confidence: {self._bucket_text(bucket)}, area: {self._area_text(area_pct)})"
+                    for label, bucket, area_pct, count in summary
+                )
                 
                 prompt = f"""
                 Based on the following semantic segmentation results from a DeepLabV3+ computer vision model, provide a natural, engaging description of what was found in the image:
@@ -127,7 +117,9 @@ class GeminiService:
                 """
             
             response = self.model.generate_content(prompt)
-            return response.text.strip()
+            description = response.text.strip()
+            cache.set(cache_key, description)
+            return description
             
         except Exception as e:
             print(f"Error generating description with Gemini: {e}")
@@ -137,6 +129,60 @@ class GeminiService:
                 return f"Successfully detected {count} object{'s' if count != 1 else ''} in the image with high confidence."
             else:
                 return "AI vision analysis completed successfully."
+
+    @staticmethod
+    def _summarize(detections, image_type):
+        """
+        Normalized, order-independent summary of the results that the prompt
+        is built from (and the description cache is keyed on)
+        """
+        if image_type == "object_detection":
+            if any('frame' in detection for detection in detections):
+                frames = {}
+                for detection in detections:
+                    frames.setdefault(detection.get('class', 'unknown object'), set()).add(detection.get('frame', 0))
+                return sorted((class_name, len(class_frames)) for class_name, class_frames in frames.items())
+
+            counts = {}
+            for detection in detections:
+                key = (detection.get('class', 'unknown object'), GeminiService._bucket(detection.get('confidence', 0)))
+                counts[key] = counts.get(key, 0) + 1
+            return sorted((class_name, bucket, count) for (class_name, bucket), count in counts.items())
+
+        if image_type == "image_segmentation":
+            counts = {}
+            for segment in detections:
+                # Area share rounded to 5%; None for results without it
+                area_pct = segment.get('area_percentage')
+                area_pct = int(round(area_pct / 5.0) * 5) if area_pct is not None else None
+                key = (segment.get('label', 'unknown object'), GeminiService._bucket(segment.get('confidence', 0)), area_pct)
+                counts[key] = counts.get(key, 0) + 1
+            # A label/bucket pair can have both a None and a numeric area
+            return sorted(
+                ((label, bucket, area_pct, count) for (label, bucket, area_pct), count in counts.items()),
+                key=lambda item: (item[0], item[1], -1 if item[2] is None else item[2], item[3])
+            )
+
+        # Free-form results: key on their exact content
+        return json.dumps(detections, sort_keys=True, default=str)
+
+    @staticmethod
+    def _bucket(confidence):
+        """Lower edge of the confidence bucket, e.g. 0.87 -> 0.8"""
+        index = min(int(float(confidence) / DESCRIPTION_CONFIDENCE_BUCKET), int(1 / DESCRIPTION_CONFIDENCE_BUCKET) - 1)
+        return round(index * DESCRIPTION_CONFIDENCE_BUCKET, 2)
+
+    @staticmethod
+    def _bucket_text(bucket):
+        return f"{bucket:.0%}-{bucket + DESCRIPTION_CONFIDENCE_BUCKET:.0%}"
+
+    @staticmethod
+    def _area_text(area_pct):
+        if area_pct is None:
+            return "unknown share of the image"
+        if area_pct == 0:
+            return "under 3% of the image"
+        return f"about {area_pct}% of the image"
     
     def generate_technical_summary(self, detections, processing_time, model_used):
         """
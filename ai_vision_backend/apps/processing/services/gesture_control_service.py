@@ -1,10 +1,22 @@
 import mediapipe as mp
 import cv2
 import numpy as np
-import base64
-import math
 import os
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from .hands_graph_pool import HandsGraphPool, StaticHandsPool, GesturePoolBusy
+from .gesture_rules import GESTURE_RULES
+from .gesture_temporal import TemporalGestureEngine
+from .hand_roi import HandROITracker
+from .metrics import metrics
+from .frame_decoding import decode_frame
+from .frame_similarity import FrameSkipper
+
+# Landmark indices of the index, middle, ring and pinky finger tips and PIP joints
+FINGER_TIPS = np.array([8, 12, 16, 20])
+FINGER_PIPS = np.array([6, 10, 14, 18])
 
 class GestureControlService:
     _instance = None
@@ -25,30 +37,57 @@ class GestureControlService:
         self.mp_hands = mp.solutions.hands
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
-        # Serialize access to MediaPipe graph to avoid timestamp mismatch on concurrent requests
-        self.process_lock = threading.Lock()
+
+        # One tracking-mode graph per realtime client, so streams run in
+        # parallel without sharing timestamps or tracking state; ROI crop
+        # graphs come out of the same capped pool
+        self.graph_pool = HandsGraphPool(
+            factory=self._create_tracking_graph,
+            max_graphs=settings.GESTURE_MAX_GRAPHS,
+            idle_seconds=settings.GESTURE_GRAPH_IDLE_SECONDS,
+            crop_factory=self._create_static_graph
+        )
+        
+        # Uploaded images run on their own static-image-mode graphs, fully
+        # isolated from the realtime tracking graphs above
+        self.static_pool = StaticHandsPool(
+            factory=self._create_static_graph,
+            size=settings.GESTURE_STATIC_GRAPHS
+        )
         
         # Initialize hands model with optimized settings and error handling
         try:
-            self.hands = self.mp_hands.Hands(
-                static_image_mode=False,
-                max_num_hands=2,
-                min_detection_confidence=0.7,
-                min_tracking_confidence=0.5
-            )
+            self.static_pool.prime()
             self._initialized = True
             print("MediaPipe Hands initialized successfully")
         except Exception as e:
             print(f"MediaPipe initialization error: {e}")
-            self.hands = None
             self._initialized = False
 
+    def _create_tracking_graph(self):
+        """Build a tracking-mode Hands graph for a video stream"""
+        return self.mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=2,
+            min_detection_confidence=0.7,
+            min_tracking_confidence=0.5
+        )
+
+    def _create_static_graph(self):
+        """Build a static-image-mode Hands graph: full detection on every image"""
+        return self.mp_hands.Hands(
+            static_image_mode=True,
+            max_num_hands=2,
+            min_detection_confidence=0.7
+        )
+
     def close(self):
         """Manually close MediaPipe resources"""
         try:
-            if hasattr(self, 'hands') and self.hands is not None:
-                self.hands.close()
-                self.hands = None
+            if hasattr(self, 'graph_pool'):
+                self.graph_pool.close_all()
+            if hasattr(self, 'static_pool'):
+                self.static_pool.close_all()
                 self._initialized = False
                 print("MediaPipe Hands closed successfully")
         except Exception as e:
@@ -58,55 +97,101 @@ class GestureControlService:
         """Cleanup MediaPipe resources"""
         self.close()
 
-    def process_hand_gestures(self, frame_base64):
+    def process_hand_gestures(self, frame_data, session_id='default', lean=False, include_landmarks=False):
         """
-        Process frame with MediaPipe Hands for gesture recognition and UI control
+        Process frame with MediaPipe Hands for gesture recognition and UI control.
+        Each session_id is processed on its own pooled tracking graph, which
+        only sees full frames; when the previous frame had hands, a crop
+        around them is run on the session's static-image crop graph instead.
+        Frames nearly identical to the last inferred one reuse its landmarks.
+        With lean=True only gestures, actions and (optionally) a compact
+        landmark array are returned; static metadata is left to get_gesture_info.
         """
         try:
             # Check if MediaPipe is properly initialized
-            if not self._initialized or self.hands is None:
+            if not self._initialized:
                 return {'error': 'MediaPipe not properly initialized'}
             
-            # Decode base64 frame
-            frame_data = base64.b64decode(frame_base64)
-            frame_array = np.frombuffer(frame_data, dtype=np.uint8)
-            frame = cv2.imdecode(frame_array, cv2.IMREAD_COLOR)
+            # Decode the encoded bytes or base64 text
+            frame = decode_frame(frame_data)
             
             if frame is None:
                 return {'error': 'Failed to decode frame'}
             
-            # Convert BGR to RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            # Mark image as not writeable to improve performance and avoid unexpected graph mutations
-            frame_rgb.setflags(write=False)
-            
             # Process with MediaPipe Hands with error handling
             try:
-                with self.process_lock:
-                    hands_results = self.hands.process(frame_rgb)
+                with self.graph_pool.session(session_id) as hands_session:
+                    if hands_session.skipper is None:
+                        hands_session.skipper = FrameSkipper('gesture_frames')
+                    previous = hands_session.skipper.lookup(frame)
+
+                    if previous is not None:
+                        landmarks, hands_info, static_gestures = previous
+                    else:
+                        roi = hands_session.roi
+                        if roi is None and settings.GESTURE_ROI_ENABLED:
+                            roi = hands_session.roi = HandROITracker()
+
+                        image, window = roi.crop(frame) if roi is not None else (frame, None)
+                        # Crops move with the hands, so they never go to the
+                        # tracking graph, whose state is in full-frame coordinates
+                        crop_graph = self.graph_pool.crop_graph(hands_session) if window is not None else None
+                        if crop_graph is None:
+                            window = None
+
+                        start = time.perf_counter()
+                        cropped = window is not None
+                        if cropped:
+                            hands_results = crop_graph.process(self._to_rgb(image))
+                        else:
+                            hands_results = hands_session.graph.process(self._to_rgb(frame))
+
+                        if window is not None and not hands_results.multi_hand_landmarks:
+                            # Hands left the crop: search the full frame right away
+                            metrics.incr('gesture.roi_lost')
+                            roi.reset()
+                            window = None
+                            hands_results = hands_session.graph.process(self._to_rgb(frame))
+                        metrics.incr('gesture.roi_frames' if window is not None else 'gesture.full_frames')
+                        # Lost crops are charged to the ROI path, which caused their second pass
+                        metrics.observe(
+                            'gesture.roi_ms' if cropped else 'gesture.full_frame_ms',
+                            (time.perf_counter() - start) * 1000
+                        )
+
+                        if hands_results.multi_hand_landmarks:
+                            landmarks, hands_info = self._extract_hands_landmarks(hands_results.multi_hand_landmarks, hands_results.multi_handedness)
+                        else:
+                            landmarks, hands_info = np.zeros((0, 21, 3), dtype=np.float32), []
+
+                        if roi is not None:
+                            landmarks = roi.to_frame(landmarks, window, frame.shape)
+                            roi.update(landmarks, frame.shape)
+                        static_gestures = self._classify_hands(landmarks, hands_info)
+                        hands_session.skipper.store((landmarks, hands_info, static_gestures))
+
+                    # Temporal layer: motion gestures, debouncing and state-change actions.
+                    # Skipped frames still count towards debouncing and motion history.
+                    if hands_session.temporal is None:
+                        hands_session.temporal = TemporalGestureEngine()
+                    gestures, fired = hands_session.temporal.update(landmarks, hands_info, static_gestures)
+            except GesturePoolBusy as busy:
+                return {'error': str(busy), 'busy': True}
             except Exception as mp_error:
                 print(f"MediaPipe processing error: {mp_error}")
                 return {'error': f'MediaPipe processing failed: {str(mp_error)}'}
-            finally:
-                # Restore writeable flag
-                try:
-                    frame_rgb.setflags(write=True)
-                except Exception:
-                    pass
             
+            if lean:
+                return self._lean_results(landmarks, hands_info, gestures, fired, include_landmarks)
+
             results = {
-                'hands': None,
-                'gestures': [],
-                'ui_actions': [],
+                'hands': self._serialize_hands(landmarks, hands_info) if hands_info else None,
+                'gestures': gestures,
+                'ui_actions': self._map_gestures_to_actions(fired),
                 'stats': {},
                 'educational_info': {}
             }
-            
-            if hands_results.multi_hand_landmarks:
-                results['hands'] = self._extract_hands_landmarks(hands_results.multi_hand_landmarks, hands_results.multi_handedness)
-                results['gestures'] = self._detect_hand_gestures(results['hands'])
-                results['ui_actions'] = self._map_gestures_to_actions(results['gestures'])
-            
+
             # Generate statistics and educational info
             results['stats'] = self._generate_stats(results)
             results['educational_info'] = self._get_educational_info()
@@ -117,10 +202,25 @@ class GestureControlService:
             print(f"Gesture processing error: {e}")
             return {'error': str(e)}
 
+    @staticmethod
+    def _to_rgb(image):
+        """Convert BGR to RGB, marked read-only so MediaPipe can skip copying it"""
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image_rgb.setflags(write=False)
+        return image_rgb
+
     def _extract_hands_landmarks(self, multi_hand_landmarks, multi_handedness):
-        """Extract hand landmarks with handedness (corrected mapping)"""
-        hands = []
-        for idx, hand_landmarks in enumerate(multi_hand_landmarks):
+        """
+        Extract hand landmarks with handedness (corrected mapping).
+        Returns a (hands, 21, 3) float32 landmark array plus per-hand info.
+        """
+        landmarks = np.array(
+            [[(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark] for hand_landmarks in multi_hand_landmarks],
+            dtype=np.float32
+        ).reshape(-1, 21, 3)
+
+        hands_info = []
+        for idx in range(len(multi_hand_landmarks)):
             raw_handedness = multi_handedness[idx].classification[0].label if multi_handedness else 'Unknown'
             confidence = multi_handedness[idx].classification[0].score if multi_handedness else 0.0
             
@@ -132,97 +232,92 @@ class GestureControlService:
             else:
                 handedness = raw_handedness
             
-            landmarks = []
-            for i, landmark in enumerate(hand_landmarks.landmark):
-                landmarks.append({
-                    'id': i,
-                    'x': float(landmark.x),
-                    'y': float(landmark.y),
-                    'z': float(landmark.z)
-                })
-            
-            hands.append({
+            hands_info.append({
                 'handedness': handedness,
-                'confidence': float(confidence),
-                'landmarks': landmarks
+                'confidence': float(confidence)
             })
         
-        return hands
+        return landmarks, hands_info
 
-    def _detect_hand_gestures(self, hands_data):
-        """Detect hand gestures with improved accuracy"""
-        gestures = []
-        
-        for hand in hands_data:
-            landmarks = hand['landmarks']
-            handedness = hand['handedness']
-            
-            # Detect gestures in order of priority
-            if self._is_thumbs_up(landmarks):
-                gestures.append({
-                    'type': 'hand_gesture',
-                    'name': 'Thumbs Up',
-                    'emoji': '👍',
-                    'handedness': handedness,
-                    'confidence': 0.95,
-                    'action': 'next'
-                })
-            elif self._is_peace_sign(landmarks):
-                gestures.append({
-                    'type': 'hand_gesture',
-                    'name': 'Peace Sign',
-                    'emoji': '✌️',
-                    'handedness': handedness,
-                    'confidence': 0.95,
-                    'action': 'previous'
-                })
-            elif self._is_pointing(landmarks):
-                gestures.append({
-                    'type': 'hand_gesture',
-                    'name': 'Pointing',
-                    'emoji': '👆',
-                    'handedness': handedness,
-                    'confidence': 0.90,
-                    'action': 'select'
-                })
-            elif self._is_fist(landmarks):
-                gestures.append({
-                    'type': 'hand_gesture',
-                    'name': 'Fist',
-                    'emoji': '✊',
-                    'handedness': handedness,
-                    'confidence': 0.90,
-                    'action': 'close'
-                })
-            elif self._is_ok_sign(landmarks):
-                gestures.append({
-                    'type': 'hand_gesture',
-                    'name': 'OK Sign',
-                    'emoji': '👌',
-                    'handedness': handedness,
-                    'confidence': 0.90,
-                    'action': 'confirm'
-                })
-            elif self._is_wave(landmarks):
-                gestures.append({
-                    'type': 'hand_gesture',
-                    'name': 'Wave',
-                    'emoji': '👋',
-                    'handedness': handedness,
-                    'confidence': 0.85,
-                    'action': 'toggle'
-                })
-            elif self._is_open_hand(landmarks):
-                gestures.append({
-                    'type': 'hand_gesture',
-                    'name': 'Open Hand',
-                    'emoji': '👐',
-                    'handedness': handedness,
-                    'confidence': 0.85,
-                    'action': 'menu'
-                })
-        
-        return gestures
+    def _serialize_hands(self, landmarks, hands_info):
+        """Compact JSON form: 21 [x, y, z] triples per hand"""
+        rounded = np.round(landmarks, 4).tolist()
+        return [
+            {
+                'handedness': info['handedness'],
+                'confidence': info['confidence'],
+                'landmarks': hand_landmarks
+            }
+            for info, hand_landmarks in zip(hands_info, rounded)
+        ]
+
+    def _lean_results(self, landmarks, hands_info, gestures, fired, include_landmarks):
+        """Minimal realtime payload: gestures, fired actions and optional flat landmarks"""
+        lean = {
+            'gestures': [
+                {'name': g['name'], 'handedness': g['handedness'], 'action': g['action']}
+                for g in gestures
+            ],
+            'actions': [
+                {'action': g['action'], 'gesture': g['name'], 'handedness': g['handedness']}
+                for g in fired
+            ]
+        }
+        if include_landmarks and hands_info:
+            # One flat [x0, y0, z0, x1, ...] list of 63 values per hand
+            lean['handedness'] = [info['handedness'] for info in hands_info]
+            lean['landmarks'] = np.round(landmarks.reshape(len(hands_info), -1), 3).tolist()
+        return lean
+
+    def _compute_features(self, landmarks):
+        """
+        Vectorized per-hand features computed once for all hands:
+        finger extension/closure (index..pinky), thumb direction and the
+        thumb-index tip distance
+        """
+        tips_y = landmarks[:, FINGER_TIPS, 1]
+        pips_y = landmarks[:, FINGER_PIPS, 1]
+        thumb_index = landmarks[:, 4, :2] - landmarks[:, 8, :2]
+
+        return {
+            'extended': tips_y < pips_y,
+            'closed': tips_y > pips_y,
+            'thumb_up': landmarks[:, 4, 1] < landmarks[:, 3, 1],
+            'thumb_index_distance': np.sqrt((thumb_index ** 2).sum(axis=1))
+        }
+
+    def _classify_hands(self, landmarks, hands_info):
+        """Static gesture per hand from the gesture table (None where nothing matches)"""
+        if len(landmarks) == 0:
+            return []
+
+        features = self._compute_features(landmarks)
+
+        # (gestures, hands) match matrix; the first matching row wins per hand
+        matches = np.stack([rule['match'](features) for rule in GESTURE_RULES])
+        has_gesture = matches.any(axis=0)
+        first_match = matches.argmax(axis=0)
+
+        per_hand = []
+        for hand_idx, info in enumerate(hands_info):
+            if not has_gesture[hand_idx]:
+                per_hand.append(None)
+                continue
+            rule = GESTURE_RULES[first_match[hand_idx]]
+            per_hand.append({
+                'type': 'hand_gesture',
+                'name': rule['name'],
+                'emoji': rule['emoji'],
+                'handedness': info['handedness'],
+                'confidence': rule['confidence'],
+                'action': rule['action']
+            })
+
+        return per_hand
+
+    def _detect_hand_gestures(self, landmarks, hands_info):
+        """Static gestures for a single frame, in priority order"""
+        return [g for g in self._classify_hands(landmarks, hands_info) if g is not None]
 
     def _map_gestures_to_actions(self, gestures):
         """Map detected gestures to UI actions"""
@@ -238,90 +333,6 @@ class GestureControlService:
             actions.append(action)
         return actions
 
-    # Improved gesture detection methods
-    def _is_thumbs_up(self, landmarks):
-        """Detect thumbs up gesture with improved accuracy"""
-        # Thumb tip (4) should be above thumb IP (3)
-        # Other fingers should be closed
-        thumb_tip = landmarks[4]
-        thumb_ip = landmarks[3]
-        
-        # Check if thumb is extended upward
-        if thumb_tip['y'] < thumb_ip['y']:
-            # Check if other fingers are closed
-            finger_tips = [landmarks[8], landmarks[12], landmarks[16], landmarks[20]]
-            finger_pips = [landmarks[6], landmarks[10], landmarks[14], landmarks[18]]
-            
-            closed_fingers = sum(1 for tip, pip in zip(finger_tips, finger_pips) if tip['y'] > pip['y'])
-            return closed_fingers >= 3
-        
-        return False
-
-    def _is_peace_sign(self, landmarks):
-        """Detect peace sign (index and middle finger up)"""
-        # Index finger (8) and middle finger (12) should be up
-        # Ring finger (16) and pinky (20) should be down
-        index_tip = landmarks[8]
-        index_pip = landmarks[6]
-        middle_tip = landmarks[12]
-        middle_pip = landmarks[10]
-        ring_tip = landmarks[16]
-        ring_pip = landmarks[14]
-        pinky_tip = landmarks[20]
-        pinky_pip = landmarks[18]
-        
-        index_up = index_tip['y'] < index_pip['y']
-        middle_up = middle_tip['y'] < middle_pip['y']
-        ring_down = ring_tip['y'] > ring_pip['y']
-        pinky_down = pinky_tip['y'] > pinky_pip['y']
-        
-        return index_up and middle_up and ring_down and pinky_down
-
-    def _is_pointing(self, landmarks):
-        """Detect pointing (index finger extended, others closed)"""
-        index_tip = landmarks[8]
-        index_pip = landmarks[6]
-        other_tips = [landmarks[12], landmarks[16], landmarks[20]]
-        other_pips = [landmarks[10], landmarks[14], landmarks[18]]
-        
-        index_up = index_tip['y'] < index_pip['y']
-        others_down = all(tip['y'] > pip['y'] for tip, pip in zip(other_tips, other_pips))
-        
-        return index_up and others_down
-
-    def _is_fist(self, landmarks):
-        """Detect fist (all fingers closed)"""
-        finger_tips = [landmarks[8], landmarks[12], landmarks[16], landmarks[20]]
-        finger_pips = [landmarks[6], landmarks[10], landmarks[14], landmarks[18]]
-        
-        closed_fingers = sum(1 for tip, pip in zip(finger_tips, finger_pips) if tip['y'] > pip['y'])
-        return closed_fingers >= 4
-
-    def _is_ok_sign(self, landmarks):
-        """Detect OK sign (thumb and index finger touching)"""
-        thumb_tip = landmarks[4]
-        index_tip = landmarks[8]
-        
-        # Calculate distance between thumb and index finger tips
-        distance = math.sqrt((thumb_tip['x'] - index_tip['x'])**2 + (thumb_tip['y'] - index_tip['y'])**2)
-        
-        return distance < 0.05  # Threshold for touching
-
-    def _is_wave(self, landmarks):
-        """Detect wave gesture (hand moving side to side)"""
-        # This is a simplified wave detection
-        # In a real implementation, you'd track hand movement over time
-        # For now, we'll detect an open hand with slight movement
-        return self._is_open_hand(landmarks)
-
-    def _is_open_hand(self, landmarks):
-        """Detect open hand (all fingers extended)"""
-        finger_tips = [landmarks[8], landmarks[12], landmarks[16], landmarks[20]]
-        finger_pips = [landmarks[6], landmarks[10], landmarks[14], landmarks[18]]
-        
-        extended_fingers = sum(1 for tip, pip in zip(finger_tips, finger_pips) if tip['y'] < pip['y'])
-        return extended_fingers >= 4
-
     def _generate_stats(self, results):
         """Generate statistics from detection results"""
         stats = {
@@ -363,24 +374,36 @@ class GestureControlService:
                 {'gesture': 'Fist', 'emoji': '✊', 'action': 'Close current view'},
                 {'gesture': 'OK Sign', 'emoji': '👌', 'action': 'Confirm/accept'},
                 {'gesture': 'Wave', 'emoji': '👋', 'action': 'Toggle between features'},
-                {'gesture': 'Open Hand', 'emoji': '👐', 'action': 'Open menu'}
+                {'gesture': 'Open Hand', 'emoji': '👐', 'action': 'Open menu'},
+                {'gesture': 'Swipe Left', 'emoji': '👈', 'action': 'Go back to previous feature'},
+                {'gesture': 'Swipe Right', 'emoji': '👉', 'action': 'Navigate to next feature'}
             ]
         }
 
     # Legacy method for backward compatibility
     def process_gesture(self, image_path):
         """Legacy method for backward compatibility"""
+        image = cv2.imread(image_path)
+        if image is None:
+            return {
+                'landmarks': [],
+                'ai_description': 'Failed to load image.',
+                'technical_summary': 'Image loading failed.'
+            }
+        return self.process_gesture_image(image)
+
+    def process_gesture_image(self, image):
+        """Recognize static gestures in one BGR image on a pooled static-image graph"""
         try:
-            image = cv2.imread(image_path)
-            if image is None:
+            if not self._initialized:
                 return {
                     'landmarks': [],
-                    'ai_description': 'Failed to load image.',
-                    'technical_summary': 'Image loading failed.'
+                    'ai_description': 'MediaPipe not properly initialized.',
+                    'technical_summary': 'Hand detection unavailable.'
                 }
 
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = self.hands.process(image_rgb)
+            with self.static_pool.acquire(timeout=settings.GESTURE_STATIC_WAIT_SECONDS) as graph:
+                results = graph.process(self._to_rgb(image))
 
             if not results.multi_hand_landmarks:
                 return {
@@ -389,8 +412,9 @@ class GestureControlService:
                     'technical_summary': 'Hand detection failed - no landmarks found.'
                 }
 
-            hands_data = self._extract_hands_landmarks(results.multi_hand_landmarks, results.multi_handedness)
-            gestures = self._detect_hand_gestures(hands_data)
+            landmarks, hands_info = self._extract_hands_landmarks(results.multi_hand_landmarks, results.multi_handedness)
+            hands_data = self._serialize_hands(landmarks, hands_info)
+            gestures = self._detect_hand_gestures(landmarks, hands_info)
 
             return {
                 'landmarks': hands_data,
@@ -404,4 +428,37 @@ class GestureControlService:
                 'landmarks': [],
                 'ai_description': f'Error processing image: {str(e)}',
                 'technical_summary': f'Processing failed: {str(e)}'
-            }
\ No newline at end of file
+            }
+
+    def process_gesture_batch(self, images):
+        """
+        Recognize gestures in many (name, encoded bytes) images in parallel,
+        one static-image graph per worker. Results keep the input order.
+        """
+        def run(item):
+            name, data = item
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                return {'file': name, 'error': 'Failed to decode image'}
+            result = self.process_gesture_image(image)
+            result['file'] = name
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.static_pool.size) as executor:
+            return list(executor.map(run, images))
+
+    def draw_hand_landmarks(self, image_path, hands_data, output_path):
+        """Draw serialized hand landmarks and connections onto a copy of the image"""
+        image = cv2.imread(image_path)
+        if image is None:
+            return False
+
+        height, width = image.shape[:2]
+        for hand in hands_data:
+            points = [(int(x * width), int(y * height)) for x, y, _ in hand['landmarks']]
+            for start, end in self.mp_hands.HAND_CONNECTIONS:
+                cv2.line(image, points[start], points[end], (0, 255, 0), 2)
+            for point in points:
+                cv2.circle(image, point, 4, (0, 0, 255), -1)
+
+        return cv2.imwrite(output_path, image)
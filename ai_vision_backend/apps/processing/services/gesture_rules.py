@@ -0,0 +1,44 @@
+from .gesture_temporal import MOTION_GESTURES
+
+# Kept apart from gesture_control_service so the gesture list can be read
+# (by the chatbot, for one) without loading MediaPipe.
+
+# Static gesture table in priority order. Each rule maps the feature arrays
+# from GestureControlService._compute_features to a per-hand boolean array. Motion gestures (wave,
+# swipe) are detected over several frames by TemporalGestureEngine.
+GESTURE_RULES = [
+    {
+        'name': 'Thumbs Up', 'emoji': '👍', 'action': 'next', 'confidence': 0.95,
+        # Thumb extended upward, other fingers closed
+        'match': lambda f: f['thumb_up'] & (f['closed'].sum(axis=1) >= 3)
+    },
+    {
+        'name': 'Peace Sign', 'emoji': '✌️', 'action': 'previous', 'confidence': 0.95,
+        # Index and middle finger up, ring and pinky down
+        'match': lambda f: f['extended'][:, 0] & f['extended'][:, 1] & f['closed'][:, 2] & f['closed'][:, 3]
+    },
+    {
+        'name': 'Pointing', 'emoji': '👆', 'action': 'select', 'confidence': 0.90,
+        # Index finger extended, others closed
+        'match': lambda f: f['extended'][:, 0] & f['closed'][:, 1:].all(axis=1)
+    },
+    {
+        'name': 'Fist', 'emoji': '✊', 'action': 'close', 'confidence': 0.90,
+        'match': lambda f: f['closed'].sum(axis=1) >= 4
+    },
+    {
+        'name': 'OK Sign', 'emoji': '👌', 'action': 'confirm', 'confidence': 0.90,
+        # Thumb and index finger tips touching
+        'match': lambda f: f['thumb_index_distance'] < 0.05
+    },
+    {
+        'name': 'Open Hand', 'emoji': '👐', 'action': 'menu', 'confidence': 0.85,
+        'match': lambda f: f['extended'].sum(axis=1) >= 4
+    },
+]
+
+
+def describe_gestures():
+    """Every recognized gesture with its UI action, e.g. 'Thumbs Up (next), ..., Swipe Right (next)'"""
+    gestures = GESTURE_RULES + list(MOTION_GESTURES.values())
+    return ', '.join(f"{gesture['name']} ({gesture['action']})" for gesture in gestures)
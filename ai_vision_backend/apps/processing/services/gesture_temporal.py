@@ -0,0 +1,203 @@
+import time
+import numpy as np
+from django.conf import settings
+
+# Gestures recognized from hand movement over several frames
+MOTION_GESTURES = {
+    'wave': {'name': 'Wave', 'emoji': '👋', 'action': 'toggle', 'confidence': 0.85},
+    'swipe_left': {'name': 'Swipe Left', 'emoji': '👈', 'action': 'previous', 'confidence': 0.85},
+    'swipe_right': {'name': 'Swipe Right', 'emoji': '👉', 'action': 'next', 'confidence': 0.85},
+}
+
+# Trajectory thresholds, in normalized image coordinates
+MOTION_WINDOW_SECONDS = 1.0
+WAVE_MIN_AMPLITUDE = 0.08
+WAVE_MIN_REVERSALS = 2
+SWIPE_MIN_DISTANCE = 0.25
+SWIPE_MAX_SECONDS = 0.6
+STEP_NOISE = 0.01             # Ignore per-frame jitter below this when counting reversals
+STATIC_MAX_MOTION = 0.04      # A static gesture only counts while the hand holds still
+MOTION_COOLDOWN_SECONDS = 1.0
+TRACK_MAX_JUMP = 0.25         # Farthest a palm centre may move between frames and keep its track
+PALM_POINTS = [0, 5, 9, 13, 17]  # Wrist and finger bases
+
+# Sentinel for "not enough evidence to change state yet"
+_UNDECIDED = object()
+
+
+class LandmarkRingBuffer:
+    """Fixed-size ring buffer of (21, 3) landmark arrays with timestamps and static labels"""
+
+    def __init__(self, size):
+        self.size = size
+        self.landmarks = np.zeros((size, 21, 3), dtype=np.float32)
+        self.times = np.zeros(size, dtype=np.float64)
+        self.labels = [None] * size
+        self.count = 0
+        self.index = 0
+
+    def push(self, landmarks, timestamp, label):
+        self.landmarks[self.index] = landmarks
+        self.times[self.index] = timestamp
+        self.labels[self.index] = label
+        self.index = (self.index + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def clear(self):
+        self.count = 0
+        self.index = 0
+
+    def recent(self, window_seconds=None, frames=None):
+        """Chronological (landmarks, times, labels) for the last frames/seconds"""
+        order = [(self.index - self.count + i) % self.size for i in range(self.count)]
+        if frames is not None:
+            order = order[-frames:]
+        if window_seconds is not None and order:
+            newest = self.times[order[-1]]
+            order = [i for i in order if newest - self.times[i] <= window_seconds]
+        return self.landmarks[order], self.times[order], [self.labels[i] for i in order]
+
+
+class TemporalGestureEngine:
+    """
+    Per-session temporal gesture layer.
+
+    Keeps a ring buffer of landmarks per hand, detects wave and swipe from
+    the palm trajectory, debounces static gestures over N frames while the
+    hand holds still, and emits a UI action only when a hand's gesture
+    state changes. Hands are followed by palm centre rather than by their
+    handedness label, so two hands given the same label keep separate
+    buffers.
+    """
+
+    def __init__(self, buffer_size=None, debounce_frames=None):
+        self.buffer_size = buffer_size or settings.GESTURE_HISTORY_SIZE
+        self.debounce_frames = debounce_frames or settings.GESTURE_DEBOUNCE_FRAMES
+        self.buffers = {}
+        self.stable = {}
+        self.missing = {}
+        self.motion_until = {}
+        self.centers = {}
+        self.next_track = 0
+
+    def update(self, landmarks, hands_info, static_gestures, now=None):
+        """
+        Feed one frame. `static_gestures` holds the per-hand static gesture
+        (or None), aligned with `landmarks`.
+        Returns (current gestures, ui actions fired on this frame).
+        """
+        now = now if now is not None else time.monotonic()
+        actions = []
+        seen = set()
+
+        tracks = self._assign_tracks(landmarks)
+        for hand, hand_landmarks, info, static in zip(tracks, landmarks, hands_info, static_gestures):
+            seen.add(hand)
+            self.missing[hand] = 0
+
+            buffer = self.buffers.get(hand)
+            if buffer is None:
+                buffer = self.buffers[hand] = LandmarkRingBuffer(self.buffer_size)
+            buffer.push(hand_landmarks, now, static['name'] if static else None)
+
+            motion = self._detect_motion(buffer)
+            if motion is not None:
+                gesture = dict(MOTION_GESTURES[motion], type='hand_gesture', handedness=info['handedness'])
+                self.stable[hand] = gesture
+                self.motion_until[hand] = now + MOTION_COOLDOWN_SECONDS
+                buffer.clear()
+                actions.append(gesture)
+                continue
+
+            # Keep a motion gesture showing briefly instead of flickering back
+            if now < self.motion_until.get(hand, 0):
+                continue
+
+            candidate = self._debounced_static(buffer, static)
+            if candidate is _UNDECIDED:
+                continue
+
+            previous = self.stable.get(hand)
+            if (previous or {}).get('name') != (candidate or {}).get('name'):
+                self.stable[hand] = candidate
+                if candidate is not None:
+                    actions.append(candidate)
+
+        # Forget hands that have left the frame
+        for hand in list(self.buffers):
+            if hand in seen:
+                continue
+            self.missing[hand] = self.missing.get(hand, 0) + 1
+            if self.missing[hand] >= self.debounce_frames:
+                self.buffers.pop(hand, None)
+                self.stable.pop(hand, None)
+                self.missing.pop(hand, None)
+                self.motion_until.pop(hand, None)
+                self.centers.pop(hand, None)
+
+        gestures = [g for g in self.stable.values() if g is not None]
+        return gestures, actions
+
+    def _assign_tracks(self, landmarks):
+        """Match each hand to the nearest unclaimed track's last palm centre, else open a new track"""
+        centers = [np.asarray(hand)[PALM_POINTS, :2].mean(axis=0) for hand in landmarks]
+        pairs = sorted(
+            (float(np.linalg.norm(center - previous)), index, track)
+            for index, center in enumerate(centers)
+            for track, previous in self.centers.items()
+        )
+
+        tracks = [None] * len(centers)
+        claimed = set()
+        for distance, index, track in pairs:
+            if distance > TRACK_MAX_JUMP:
+                break
+            if tracks[index] is None and track not in claimed:
+                tracks[index] = track
+                claimed.add(track)
+
+        for index, center in enumerate(centers):
+            if tracks[index] is None:
+                tracks[index] = self.next_track
+                self.next_track += 1
+            self.centers[tracks[index]] = center
+        return tracks
+
+    def _debounced_static(self, buffer, static):
+        """The static gesture once held for N still frames, None once released, else undecided"""
+        recent, _, labels = buffer.recent(frames=self.debounce_frames)
+        if len(labels) < self.debounce_frames or len(set(labels)) != 1:
+            return _UNDECIDED
+        if labels[0] is None:
+            return None
+
+        centers = recent[:, PALM_POINTS, :2].mean(axis=1)
+        if np.ptp(centers, axis=0).max() > STATIC_MAX_MOTION:
+            return _UNDECIDED
+        return static
+
+    def _detect_motion(self, buffer):
+        """Classify the palm trajectory in the recent window as wave, swipe or nothing"""
+        recent, times, labels = buffer.recent(window_seconds=MOTION_WINDOW_SECONDS)
+        if len(times) < 4:
+            return None
+
+        xs = recent[:, PALM_POINTS, 0].mean(axis=1)
+        steps = np.diff(xs)
+
+        # Wave: open hand moving side to side with several direction reversals
+        moving = steps[np.abs(steps) > STEP_NOISE]
+        reversals = int(np.count_nonzero(np.diff(np.sign(moving)))) if len(moving) > 1 else 0
+        open_ratio = sum(1 for label in labels if label == 'Open Hand') / len(labels)
+        if open_ratio >= 0.6 and np.ptp(xs) >= WAVE_MIN_AMPLITUDE and reversals >= WAVE_MIN_REVERSALS:
+            return 'wave'
+
+        # Swipe: fast, mostly one-directional horizontal movement
+        swipe = buffer.recent(window_seconds=SWIPE_MAX_SECONDS)[0][:, PALM_POINTS, 0].mean(axis=1)
+        if len(swipe) >= 3:
+            net = swipe[-1] - swipe[0]
+            path = np.abs(np.diff(swipe)).sum()
+            if abs(net) >= SWIPE_MIN_DISTANCE and path <= 1.5 * abs(net):
+                return 'swipe_right' if net > 0 else 'swipe_left'
+
+        return None
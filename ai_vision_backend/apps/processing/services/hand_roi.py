@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+from django.conf import settings
+
+
+class HandROITracker:
+    """
+    Per-session region of interest around the hands.
+
+    After a frame with hands, the next frame is cropped to the hands'
+    bounding box plus a margin and downsized, so MediaPipe and the colour
+    conversion only work on that region. Landmarks found in the crop are
+    mapped back to full-frame normalized coordinates. Crops are run on a
+    static-image graph, since their coordinate frame changes with the
+    window; the window only moves when the hands approach its edge, and it
+    is dropped (full-frame search) when the hands are lost or every
+    `refresh_frames` frames so newly raised hands are found.
+    """
+
+    def __init__(self, margin=None, max_side=None, refresh_frames=None):
+        self.margin = margin if margin is not None else settings.GESTURE_ROI_MARGIN
+        self.max_side = max_side or settings.GESTURE_ROI_MAX_SIDE
+        self.refresh_frames = refresh_frames or settings.GESTURE_ROI_REFRESH_FRAMES
+        self.window = None  # [x1, y1, x2, y2] in pixels of the full frame
+        self.frames_in_roi = 0
+
+    def crop(self, frame):
+        """
+        Return (image, window) for the next inference. `window` is None when
+        the whole frame must be searched.
+        """
+        if self.window is None or self.frames_in_roi >= self.refresh_frames:
+            self.reset()
+            return frame, None
+
+        x1, y1, x2, y2 = self.window
+        image = frame[y1:y2, x1:x2]
+        scale = self.max_side / max(image.shape[:2])
+        if scale < 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        self.frames_in_roi += 1
+        return image, self.window
+
+    def to_frame(self, landmarks, window, frame_shape):
+        """Map (hands, 21, 3) landmarks normalized to the crop back to the full frame"""
+        if window is None or not len(landmarks):
+            return landmarks
+
+        height, width = frame_shape[:2]
+        x1, y1, x2, y2 = window
+        crop_width = x2 - x1
+        mapped = landmarks.copy()
+        mapped[..., 0] = (landmarks[..., 0] * crop_width + x1) / width
+        mapped[..., 1] = (landmarks[..., 1] * (y2 - y1) + y1) / height
+        # MediaPipe scales z roughly like x
+        mapped[..., 2] = landmarks[..., 2] * crop_width / width
+        return mapped
+
+    def update(self, landmarks, frame_shape):
+        """Move the window to follow full-frame landmarks, or clear it when no hands are left"""
+        if not len(landmarks):
+            self.reset()
+            return
+
+        height, width = frame_shape[:2]
+        xs = landmarks[..., 0].ravel() * width
+        ys = landmarks[..., 1].ravel() * height
+        box = np.array([xs.min(), ys.min(), xs.max(), ys.max()])
+
+        # Keep the current window while the hands stay well inside it
+        if self.window is not None:
+            x1, y1, x2, y2 = self.window
+            inset = 0.5 * self.margin * max(box[2] - box[0], box[3] - box[1])
+            if (box[0] - inset >= x1 and box[1] - inset >= y1 and
+                    box[2] + inset <= x2 and box[3] + inset <= y2):
+                return
+
+        # Square window around the hands, so the crop keeps a fixed aspect ratio
+        side = max(box[2] - box[0], box[3] - box[1]) * (1 + 2 * self.margin)
+        center_x = (box[0] + box[2]) / 2
+        center_y = (box[1] + box[3]) / 2
+        x1 = int(max(0, center_x - side / 2))
+        y1 = int(max(0, center_y - side / 2))
+        x2 = int(min(width, center_x + side / 2))
+        y2 = int(min(height, center_y + side / 2))
+
+        # Nothing to gain when the window covers most of the frame
+        if x2 - x1 < 16 or y2 - y1 < 16 or (x2 - x1) * (y2 - y1) > 0.6 * width * height:
+            self.window = None
+        else:
+            self.window = [x1, y1, x2, y2]
+
+    def reset(self):
+        self.window = None
+        self.frames_in_roi = 0
@@ -0,0 +1,267 @@
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from .metrics import metrics
+
+
+class GesturePoolBusy(Exception):
+    """Raised when every graph slot is taken by an active client"""
+
+
+class HandsSession:
+    """A client's own MediaPipe Hands graph and its tracking state"""
+
+    def __init__(self, session_id, graph):
+        self.session_id = session_id
+        self.graph = graph
+        # Static-image graph for region-of-interest crops, whose coordinate
+        # frame differs from the full frames the tracking graph sees
+        self.crop_graph = None
+        # Pool slots held: the tracking graph, plus one once a crop graph is reserved
+        self.slots = 1
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        # Per-stream state kept by the gesture service, created on first use:
+        # TemporalGestureEngine, HandROITracker and FrameSkipper
+        self.temporal = None
+        self.roi = None
+        self.skipper = None
+
+
+class HandsGraphPool:
+    """
+    Bounded pool of MediaPipe Hands graphs with session affinity.
+
+    Each client session gets its own tracking-mode graph (plus a static
+    crop graph when ROI cropping is on), so independent streams run in
+    parallel and never share tracking state. Frames of the
+    same session are serialized on that session's lock. Idle sessions are
+    closed, and the least recently used idle session is evicted when the
+    pool is full. Crop graphs count against `max_graphs` like tracking
+    graphs do.
+    """
+
+    def __init__(self, factory, max_graphs, idle_seconds, name='gesture', crop_factory=None):
+        self.factory = factory
+        self.crop_factory = crop_factory
+        self.max_graphs = max_graphs
+        self.idle_seconds = idle_seconds
+        self.name = name
+        self._sessions = OrderedDict()
+        self._slots = 0
+        self._lock = threading.Lock()
+
+        metrics.register_gauge(f'{name}.graphs_active', lambda: self._slots)
+
+    @contextmanager
+    def session(self, session_id):
+        """Check out a session's graph for one frame"""
+        hands_session = self._checkout(session_id)
+        try:
+            with hands_session.lock:
+                if hands_session.graph is None:
+                    # Built outside the pool lock: graph construction loads the
+                    # models, and only this session's frames need to wait for it
+                    hands_session.graph = self.factory()
+                    metrics.incr(f'{self.name}.graphs_created')
+                yield hands_session
+        finally:
+            with self._lock:
+                hands_session.in_use -= 1
+                hands_session.last_used = time.monotonic()
+
+    def crop_graph(self, hands_session):
+        """
+        The session's crop graph, built on first use. Call with the session
+        checked out. Returns None when every slot is held by an active
+        session, so the caller runs the full frame instead.
+        """
+        if hands_session.crop_graph is not None:
+            return hands_session.crop_graph
+
+        closed = []
+        try:
+            with self._lock:
+                if self._slots >= self.max_graphs:
+                    victim = self._least_recently_used_idle()
+                    if victim is None:
+                        metrics.incr(f'{self.name}.crop_graphs_refused')
+                        return None
+                    closed.append(self._remove(victim))
+                    metrics.incr(f'{self.name}.graphs_evicted')
+                hands_session.slots += 1
+                self._slots += 1
+        finally:
+            for evicted in closed:
+                self._close(evicted)
+
+        try:
+            hands_session.crop_graph = self.crop_factory()
+        except Exception:
+            with self._lock:
+                hands_session.slots -= 1
+                if self._sessions.get(hands_session.session_id) is hands_session:
+                    self._slots -= 1
+            raise
+        metrics.incr(f'{self.name}.crop_graphs_created')
+        return hands_session.crop_graph
+
+    def discard(self, session_id):
+        """Close a session's graph if it is not in use"""
+        with self._lock:
+            hands_session = self._sessions.get(session_id)
+            if hands_session is None or hands_session.in_use:
+                return
+            self._remove(hands_session)
+        self._close(hands_session)
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._slots = 0
+        for hands_session in sessions:
+            self._close(hands_session)
+
+    def _checkout(self, session_id):
+        closed = []
+        try:
+            with self._lock:
+                closed.extend(self._evict_idle())
+
+                hands_session = self._sessions.get(session_id)
+                if hands_session is None:
+                    while self._slots >= self.max_graphs:
+                        victim = self._least_recently_used_idle()
+                        if victim is None:
+                            metrics.incr(f'{self.name}.pool_busy')
+                            raise GesturePoolBusy(f'All {self.max_graphs} gesture graphs are in use')
+                        closed.append(self._remove(victim))
+                        metrics.incr(f'{self.name}.graphs_evicted')
+
+                    # Reserve the slot now; the graph is built on first use
+                    hands_session = HandsSession(session_id, None)
+                    self._sessions[session_id] = hands_session
+                    self._slots += 1
+
+                self._sessions.move_to_end(session_id)
+                hands_session.in_use += 1
+                return hands_session
+        finally:
+            # Close evicted graphs outside the pool lock
+            for hands_session in closed:
+                self._close(hands_session)
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        idle = [
+            s for s in self._sessions.values()
+            if not s.in_use and now - s.last_used > self.idle_seconds
+        ]
+        for hands_session in idle:
+            self._remove(hands_session)
+        if idle:
+            metrics.incr(f'{self.name}.graphs_idle_closed', len(idle))
+        return idle
+
+    def _least_recently_used_idle(self):
+        for hands_session in self._sessions.values():
+            if not hands_session.in_use:
+                return hands_session
+        return None
+
+    def _remove(self, hands_session):
+        """Drop a session and free its slots (called under the pool lock)"""
+        del self._sessions[hands_session.session_id]
+        self._slots -= hands_session.slots
+        return hands_session
+
+    @staticmethod
+    def _close(hands_session):
+        for graph in (hands_session.graph, hands_session.crop_graph):
+            if graph is None:
+                continue
+            try:
+                graph.close()
+            except Exception as e:
+                print(f"MediaPipe cleanup error: {e}")
+
+
+class StaticHandsPool:
+    """
+    Bounded pool of static-image-mode Hands graphs for uploaded files.
+
+    Uploads never touch the realtime tracking graphs: every image is run on
+    a graph checked out from this pool, and each graph serves one image at
+    a time. Graphs are built lazily up to `size`; callers wait for a free
+    one beyond that.
+    """
+
+    def __init__(self, factory, size, name='gesture_static'):
+        self.factory = factory
+        self.size = size
+        self.name = name
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._graphs = []
+        self._lock = threading.Lock()
+
+        metrics.register_gauge(f'{name}.graphs_created', lambda: self._created)
+
+    def prime(self):
+        """Build one graph up front, so a broken MediaPipe install fails at startup"""
+        with self.acquire():
+            pass
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Check out a graph for one image"""
+        graph = self._checkout(timeout)
+        try:
+            yield graph
+        finally:
+            self._idle.put(graph)
+
+    def close_all(self):
+        with self._lock:
+            graphs = list(self._graphs)
+            self._graphs.clear()
+            self._created = 0
+        self._idle = queue.LifoQueue()
+        for graph in graphs:
+            try:
+                graph.close()
+            except Exception as e:
+                print(f"MediaPipe cleanup error: {e}")
+
+    def _checkout(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+
+        if can_create:
+            # Build outside the lock; graph construction loads the models
+            try:
+                graph = self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            with self._lock:
+                self._graphs.append(graph)
+            return graph
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            metrics.incr(f'{self.name}.pool_busy')
+            raise GesturePoolBusy(f'All {self.size} static gesture graphs are in use')
@@ -3,8 +3,10 @@ import base64
 import io
 from PIL import Image
 from dotenv import load_dotenv
-import google.generativeai as genai
+from django.conf import settings
 from .object_detection import ObjectDetectionService
+from .llm_client import LLMClientManager, LLMUnavailable
+from .description_worker import DescriptionWorker
 
 # Load environment variables
 load_dotenv()
@@ -14,21 +16,22 @@ class ImageAnalysisService:
         # Initialize YOLO service
         self.object_detection_service = ObjectDetectionService()
 
-        # Initialize Gemini
-        gemini_api_key = os.getenv("GEMINI_API_KEY")
-        if gemini_api_key:
-            genai.configure(api_key=gemini_api_key)
-            self.gemini_model = genai.GenerativeModel(
-                'gemini-2.5-flash',
+        # Shared Gemini handle
+        llm = LLMClientManager()
+        if llm.is_available():
+            self.gemini_model = llm.model(
+                settings.LLM_CHAT_MODEL,
                 system_instruction="You are an AI expert in image understanding and caption generation."
             )
         else:
             print("Warning: GEMINI_API_KEY not found. Caption generation will be disabled.")
             self.gemini_model = None
 
-    def analyze_image_data_uri(self, image_data_uri, confidence_threshold=0.5):
+    def analyze_image_data_uri(self, image_data_uri, confidence_threshold=0.5, async_description=False):
         """
-        Analyze image from data URI: decode, detect objects, generate caption
+        Analyze image from data URI: decode, detect objects, generate caption.
+        With async_description the caption is generated in the background and
+        'caption' is None with a 'description_id' to fetch it by.
         Returns: {
             'imageDataUrl': original_data_uri,
             'objects': detected_objects_list,
@@ -75,23 +78,23 @@ class ImageAnalysisService:
 
                 # 5. Generate AI Caption with Gemini
                 caption = ""
+                description_id = None
                 if self.gemini_model and detected_objects:
-                    try:
-                        prompt = self._build_caption_prompt(detected_objects)
-                        response = self.gemini_model.generate_content(prompt)
-                        caption = response.text.strip()
-                        if caption.startswith('"') and caption.endswith('"'):
-                            caption = caption[1:-1]  # Clean up quotes
-                    except Exception as e:
-                        print(f"Error generating caption: {e}")
-                        caption = "Caption generation failed"
+                    if async_description:
+                        caption = None
+                        description_id = DescriptionWorker().submit('image_analysis', self._generate_caption, detected_objects)
+                    else:
+                        caption = self._generate_caption(detected_objects)
 
                 # 6. Return combined result
-                return {
+                result = {
                     'imageDataUrl': image_data_uri,
                     'objects': detected_objects,
                     'caption': caption,
                 }
+                if async_description:
+                    result['description_id'] = description_id
+                return result
 
             finally:
                 # Clean up temp file
@@ -101,6 +104,25 @@ class ImageAnalysisService:
         except Exception as e:
             return {'error': f'An unexpected error occurred: {str(e)}'}
 
+    def _generate_caption(self, detected_objects):
+        """Ask Gemini for a caption of the detected objects"""
+        try:
+            prompt = self._build_caption_prompt(detected_objects)
+            response = self.gemini_model.generate_content(prompt)
+            caption = response.text.strip()
+            if caption.startswith('"') and caption.endswith('"'):
+                caption = caption[1:-1]  # Clean up quotes
+            return caption
+        except LLMUnavailable:
+            # Template caption while Gemini is failing or saturated
+            counts = {}
+            for obj in detected_objects:
+                counts[obj['class']] = counts.get(obj['class'], 0) + 1
+            return "Detected " + ", ".join(f"{count} {name}" for name, count in sorted(counts.items()))
+        except Exception as e:
+            print(f"Error generating caption: {e}")
+            return "Caption generation failed"
+
     def _save_temp_image(self, image):
         """Save PIL image to temporary file and return path"""
         try:
@@ -7,6 +7,7 @@ from PIL import Image
 import os
 import time
 from .gemini_service import GeminiService
+from .description_worker import DescriptionWorker
 
 class ImageSegmentationService:
     def __init__(self):
@@ -46,9 +47,11 @@ class ImageSegmentationService:
             transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
         ])
 
-    def process_segmentation(self, image_path):
+    def process_segmentation(self, image_path, async_description=False):
         """
-        Process image and return segmentation results
+        Process image and return segmentation results.
+        With async_description the AI description is generated in the
+        background and only its description_id is returned.
         """
         start_time = time.time()
         
@@ -72,13 +75,21 @@ class ImageSegmentationService:
             segments = self._extract_segments(prediction, original_size)
             
             # Generate AI description
-            ai_description = self._generate_ai_description(image, segments)
+            description_id = None
+            if async_description:
+                ai_description = None
+                description_id = DescriptionWorker().submit(
+                    'image_segmentation', self._generate_ai_description, image, segments
+                )
+            else:
+                ai_description = self._generate_ai_description(image, segments)
             
             processing_time = time.time() - start_time
             
             return {
                 'segments': segments,
                 'ai_description': ai_description,
+                'description_id': description_id,
                 'technical_summary': f'Segmentation performed using DeepLabV3+ model with ResNet-50 backbone. Processing time: {processing_time:.2f} seconds.',
                 'processing_time': processing_time,
                 'model_used': 'DeepLabV3+',
@@ -138,6 +149,7 @@ class ImageSegmentationService:
                     'label': display_label,
                     'confidence': confidence,
                     'area': int(area),
+                    'area_percentage': round(100.0 * area / prediction.size, 1),
                     'bbox': [int(x_min), int(y_min), int(x_max - x_min), int(y_max - y_min)]
                 })
         
@@ -0,0 +1,280 @@
+import os
+import threading
+import time
+from django.conf import settings
+from .metrics import metrics
+
+
+class LLMUnavailable(Exception):
+    """Raised without calling the model when its breaker is open or too many calls are in flight"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After `failure_threshold` failures in a row the breaker opens and calls
+    fail fast for `reset_seconds`; then one trial call is let through
+    (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def allow(self):
+        """True if a call may go ahead now"""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def release_trial(self):
+        """Give back a trial slot taken by allow() without making a call"""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return 'closed'
+        if now - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+
+class StubResponse:
+    """Minimal stand-in for a Gemini response: .text, and iterable as stream chunks"""
+
+    def __init__(self, text):
+        self.text = text
+
+    def __iter__(self):
+        for word in self.text.split(' '):
+            yield StubResponse(word + ' ')
+
+
+class StubGenerativeModel:
+    """
+    Local backend for tests and benchmarks: no network, deterministic text
+    and an optional fixed latency (LLM_STUB_LATENCY_MS).
+    """
+
+    def __init__(self, model_name, system_instruction=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+
+    def generate_content(self, contents, request_options=None, stream=False, **kwargs):
+        latency_ms = settings.LLM_STUB_LATENCY_MS
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+        if isinstance(contents, (list, tuple)):
+            prompt = ' '.join(part for part in contents if isinstance(part, str))
+        else:
+            prompt = str(contents)
+        summary = ' '.join(prompt.split())[:80]
+        return StubResponse(f'[{self.model_name} stub] {summary}')
+
+
+class LLMModel:
+    """
+    Cached handle to one model. Every call gets a deadline, passes the
+    model's circuit breaker and takes a slot from the shared in-flight
+    semaphore; when either refuses, LLMUnavailable is raised at once so
+    callers fall back to their local template text without waiting.
+    """
+
+    def __init__(self, name, model, timeout, breaker, semaphore):
+        self.name = name
+        self.model = model
+        self.timeout = timeout
+        self.breaker = breaker
+        self.semaphore = semaphore
+
+    def generate_content(self, contents, timeout=None, **kwargs):
+        self._admit()
+
+        request_options = {'timeout': timeout or self.timeout}
+        start = time.perf_counter()
+        try:
+            response = self.model.generate_content(contents, request_options=request_options, **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            metrics.incr(f'llm.{self.name}.errors')
+            raise
+        else:
+            self.breaker.record_success()
+            self._record_usage(response)
+            return response
+        finally:
+            self.semaphore.release()
+            metrics.incr(f'llm.{self.name}.requests')
+            metrics.observe(f'llm.{self.name}.latency_ms', (time.perf_counter() - start) * 1000)
+
+    def stream_content(self, contents, timeout=None, **kwargs):
+        """
+        Yield text chunks as the model generates them. The breaker and the
+        in-flight slot cover the whole stream, not just its first chunk.
+        """
+        self._admit()
+
+        request_options = {'timeout': timeout or self.timeout}
+        start = time.perf_counter()
+        last_chunk = None
+        try:
+            for chunk in self.model.generate_content(contents, request_options=request_options, stream=True, **kwargs):
+                if last_chunk is None:
+                    metrics.observe(f'llm.{self.name}.first_chunk_ms', (time.perf_counter() - start) * 1000)
+                last_chunk = chunk
+                if chunk.text:
+                    yield chunk.text
+        except GeneratorExit:
+            # Client went away mid-stream; not a model failure
+            self.breaker.release_trial()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            metrics.incr(f'llm.{self.name}.errors')
+            raise
+        else:
+            self.breaker.record_success()
+            # The final chunk carries the usage totals for the whole stream
+            self._record_usage(last_chunk)
+        finally:
+            self.semaphore.release()
+            metrics.incr(f'llm.{self.name}.requests')
+            metrics.observe(f'llm.{self.name}.latency_ms', (time.perf_counter() - start) * 1000)
+
+    def _record_usage(self, response):
+        """Record token counts reported by the API (absent on the stub backend)"""
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, 'prompt_token_count', 0) or 0
+        output_tokens = getattr(usage, 'candidates_token_count', 0) or 0
+        metrics.observe(f'llm.{self.name}.prompt_tokens', prompt_tokens)
+        metrics.observe(f'llm.{self.name}.output_tokens', output_tokens)
+        metrics.incr(f'llm.{self.name}.prompt_tokens_total', prompt_tokens)
+        metrics.incr(f'llm.{self.name}.output_tokens_total', output_tokens)
+
+    def _admit(self):
+        """Pass the breaker and take an in-flight slot, or raise LLMUnavailable"""
+        if not self.breaker.allow():
+            metrics.incr(f'llm.{self.name}.short_circuited')
+            raise LLMUnavailable(f'{self.name} circuit breaker is open')
+        if not self.semaphore.acquire(timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS):
+            # Not the model's fault: hand back a half-open trial slot untouched
+            self.breaker.release_trial()
+            metrics.incr(f'llm.{self.name}.rejected_busy')
+            raise LLMUnavailable(f'Too many LLM calls in flight ({settings.LLM_MAX_IN_FLIGHT})')
+
+
+class LLMClientManager:
+    """
+    Process-wide LLM client.
+
+    The Gemini SDK is configured once, so every service shares one client
+    and its pooled connections, and model handles are built once per
+    (model, system instruction) and reused across requests. With
+    LLM_BACKEND=stub a local fake backend is used instead.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super(LLMClientManager, cls).__new__(cls)
+                    instance._models = {}
+                    instance._breakers = {}
+                    instance._configured = False
+                    # Bounds in-flight LLM calls in this worker process
+                    instance._semaphore = threading.BoundedSemaphore(settings.LLM_MAX_IN_FLIGHT)
+                    cls._instance = instance
+        return cls._instance
+
+    @property
+    def backend(self):
+        return settings.LLM_BACKEND
+
+    def is_available(self):
+        """True if models can be requested (a stub backend or an API key)"""
+        return self.backend == 'stub' or bool(self._api_key())
+
+    def model(self, name, system_instruction=None):
+        """Return the shared handle for a model, creating it on first use"""
+        key = (name, system_instruction)
+        handle = self._models.get(key)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            handle = self._models.get(key)
+            if handle is None:
+                handle = LLMModel(
+                    name, self._build(name, system_instruction), settings.LLM_TIMEOUT_SECONDS,
+                    self._breaker(name), self._semaphore
+                )
+                self._models[key] = handle
+                metrics.incr('llm.models_created')
+            return handle
+
+    def breaker_states(self):
+        """Current breaker state per model name"""
+        return {name: breaker.state for name, breaker in self._breakers.items()}
+
+    def _breaker(self, name):
+        """One breaker per model name, shared by its handles (called under the lock)"""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS)
+            self._breakers[name] = breaker
+            metrics.register_gauge(f'llm.{name}.breaker_state', lambda: breaker.state)
+        return breaker
+
+    def _build(self, name, system_instruction):
+        if self.backend == 'stub':
+            return StubGenerativeModel(name, system_instruction=system_instruction)
+
+        import google.generativeai as genai  # pyright: ignore[reportMissingImports]
+        if not self._configured:
+            api_key = self._api_key()
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY is required in Django settings or environment variables")
+            genai.configure(api_key=api_key, transport=settings.LLM_TRANSPORT)
+            self._configured = True
+
+        if system_instruction:
+            return genai.GenerativeModel(name, system_instruction=system_instruction)
+        return genai.GenerativeModel(name)
+
+    @staticmethod
+    def _api_key():
+        return getattr(settings, 'GEMINI_API_KEY', None) or os.getenv('GEMINI_API_KEY')
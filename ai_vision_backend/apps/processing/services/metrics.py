@@ -0,0 +1,61 @@
+import threading
+
+
+class MetricsRegistry:
+    """
+    Process-local counters and gauges for the processing services.
+
+    Counters are per worker; gauges are callables evaluated on snapshot so
+    they can report shared state (e.g. rows in the database).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._observations = {}
+        self._gauges = {}
+
+    def incr(self, name, amount=1):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def get(self, name):
+        """Return the current value of a counter"""
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def observe(self, name, value):
+        """Record a sample (e.g. a latency in ms) for count/avg/max reporting"""
+        with self._lock:
+            count, total, peak = self._observations.get(name, (0, 0.0, 0.0))
+            self._observations[name] = (count + 1, total + value, max(peak, value))
+
+    def register_gauge(self, name, func):
+        """Register a callable evaluated whenever a snapshot is taken"""
+        with self._lock:
+            self._gauges[name] = func
+
+    def snapshot(self):
+        """Return all counters and gauges as a flat dict"""
+        with self._lock:
+            data = dict(self._counters)
+            for name, (count, total, peak) in self._observations.items():
+                data[name] = {
+                    'count': count,
+                    'avg': round(total / count, 3),
+                    'max': round(peak, 3)
+                }
+            gauges = list(self._gauges.items())
+
+        for name, func in gauges:
+            try:
+                data[name] = func()
+            except Exception as e:
+                print(f"Metrics gauge error ({name}): {e}")
+                data[name] = None
+
+        return dict(sorted(data.items()))
+
+
+metrics = MetricsRegistry()
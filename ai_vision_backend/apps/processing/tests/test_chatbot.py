@@ -0,0 +1,13 @@
+from django.test import SimpleTestCase, override_settings
+from apps.processing.services.chatbot_service import ChatbotService
+
+
+@override_settings(LLM_BACKEND='stub', CHATBOT_LOCAL_ANSWERS=True, CHATBOT_LOCAL_ANSWER_THRESHOLD=0.75)
+class LocalAnswerTests(SimpleTestCase):
+
+    def test_supported_gestures_include_motion_gestures(self):
+        answer = ChatbotService().answer_locally('What gestures are supported?', 'gesture-control')
+
+        self.assertEqual(answer['source'], 'local')
+        for gesture in ('Thumbs Up', 'Wave', 'Swipe Left', 'Swipe Right'):
+            self.assertIn(gesture, answer['response'])
@@ -0,0 +1,31 @@
+import io
+import zipfile
+from django.test import SimpleTestCase, override_settings
+from apps.processing.services.face_enrollment import FaceEnrollmentService
+
+
+def make_archive(names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name in names:
+            archive.writestr(name, b'image')
+    buffer.seek(0)
+    return buffer
+
+
+@override_settings(FACE_ENROLL_MAX_IMAGES=10, FACE_ENROLL_MAX_BYTES=1024 * 1024, FACE_ENROLL_WORKERS=1)
+class CollectFromArchiveTests(SimpleTestCase):
+
+    def labels(self, names):
+        items = FaceEnrollmentService().collect_from_archive(make_archive(names))
+        return [label for label, _, _ in items]
+
+    def test_label_is_the_image_folder(self):
+        self.assertEqual(self.labels(['alice/1.jpg', 'bob/1.jpg']), ['alice', 'bob'])
+
+    def test_wrapped_archive_uses_the_inner_folder(self):
+        labels = self.labels(['team/alice/1.jpg', 'team/alice/2.jpg', 'team/bob/1.jpg'])
+        self.assertEqual(labels, ['alice', 'alice', 'bob'])
+
+    def test_root_files_are_labelled_from_the_file_name(self):
+        self.assertEqual(self.labels(['alice_1.jpg', 'bob-2.png']), ['alice', 'bob'])
@@ -0,0 +1,46 @@
+import numpy as np
+from django.test import SimpleTestCase
+from apps.processing.services.gesture_temporal import TemporalGestureEngine
+
+OPEN_HAND = {'name': 'Open Hand', 'emoji': '🖐️', 'action': 'menu', 'confidence': 0.9}
+
+
+def hand_at(x, y=0.5):
+    """A flat hand whose palm centre sits at (x, y)"""
+    landmarks = np.zeros((21, 3), dtype=np.float32)
+    landmarks[:, 0] = x
+    landmarks[:, 1] = y
+    return landmarks
+
+
+class TemporalGestureEngineTests(SimpleTestCase):
+
+    def test_two_still_hands_with_the_same_label_do_not_wave(self):
+        engine = TemporalGestureEngine(buffer_size=16, debounce_frames=3)
+        hands_info = [{'handedness': 'Right'}, {'handedness': 'Right'}]
+
+        fired = []
+        for frame in range(20):
+            # Detection order flips between frames, as MediaPipe's may
+            xs = [0.3, 0.7] if frame % 2 else [0.7, 0.3]
+            _, actions = engine.update(
+                [hand_at(x) for x in xs], hands_info, [OPEN_HAND, OPEN_HAND], now=frame * 0.05
+            )
+            fired.extend(action['name'] for action in actions)
+
+        self.assertNotIn('Wave', fired)
+        self.assertNotIn('Swipe Left', fired)
+        self.assertNotIn('Swipe Right', fired)
+        self.assertEqual(fired.count('Open Hand'), 2)
+
+    def test_waving_hand_is_detected(self):
+        engine = TemporalGestureEngine(buffer_size=16, debounce_frames=3)
+
+        fired = []
+        for frame, x in enumerate([0.4, 0.5, 0.6, 0.5, 0.4, 0.5, 0.6]):
+            _, actions = engine.update(
+                [hand_at(x)], [{'handedness': 'Right'}], [OPEN_HAND], now=frame * 0.1
+            )
+            fired.extend(action['name'] for action in actions)
+
+        self.assertIn('Wave', fired)
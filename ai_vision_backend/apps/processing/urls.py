@@ -1,17 +1,33 @@
 from django.urls import path  # pyright: ignore[reportMissingImports]
+from rest_framework.renderers import JSONRenderer, BrowsableAPIRenderer
+from .renderers import ServerSentEventRenderer
 from .views import ProcessingViewSet
 
 urlpatterns = [
     path('analyze_image/', ProcessingViewSet.as_view({'post': 'analyze_image'})),
     # Direct processing endpoints (no session required)
+    path('direct_facial_recognition/', ProcessingViewSet.as_view({'post': 'direct_facial_recognition'})),
     path('direct_object_detection/', ProcessingViewSet.as_view({'post': 'direct_object_detection'})),
     path('direct_image_segmentation/', ProcessingViewSet.as_view({'post': 'direct_image_segmentation'})),
+    # Background AI descriptions (description_mode=async)
+    path('get_description/', ProcessingViewSet.as_view({'get': 'get_description'})),
     # Real-time facial recognition endpoints
     path('register_face/', ProcessingViewSet.as_view({'post': 'register_face'})),
+    path('bulk_register_faces/', ProcessingViewSet.as_view({'post': 'bulk_register_faces'})),
     path('recognize_frame/', ProcessingViewSet.as_view({'post': 'recognize_frame'})),
+    path('unregister_face/', ProcessingViewSet.as_view({'post': 'unregister_face'})),
+    # Gesture recognition on uploaded images
+    path('direct_gesture_recognition/', ProcessingViewSet.as_view({'post': 'direct_gesture_recognition'})),
+    path('batch_gesture_recognition/', ProcessingViewSet.as_view({'post': 'batch_gesture_recognition'})),
     # Real-time gesture control endpoints
     path('process_gesture_frame/', ProcessingViewSet.as_view({'post': 'process_gesture_frame'})),
     path('get_gesture_info/', ProcessingViewSet.as_view({'get': 'get_gesture_info'})),
     # Chatbot endpoint
     path('chatbot/', ProcessingViewSet.as_view({'post': 'chatbot'})),
+    path('chatbot_stream/', ProcessingViewSet.as_view(
+        {'post': 'chatbot_stream'},
+        renderer_classes=[JSONRenderer, BrowsableAPIRenderer, ServerSentEventRenderer]
+    )),
+    # Metrics endpoint
+    path('metrics/', ProcessingViewSet.as_view({'get': 'get_metrics'})),
 ]
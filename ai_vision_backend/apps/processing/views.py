@@ -1,10 +1,18 @@
 import os
 import uuid
+import json
+import hashlib
+import zipfile
 import numpy as np
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from channels.db import database_sync_to_async
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
 from .services.object_detection import ObjectDetectionService
 from .services.image_analysis import ImageAnalysisService
 from .services.gemini_service import GeminiService
@@ -12,9 +20,50 @@ from .services.facial_recognition_service import FacialRecognitionService
 from .services.gesture_control_service import GestureControlService
 from .services.image_segmentation_service import ImageSegmentationService
 from .services.chatbot_service import ChatbotService
+from .services.face_embedding_store import FaceEmbeddingStore, FaceSessionExpired
+from .services.metrics import metrics
+from .services.face_tracker import face_trackers
+from .services.face_enrollment import FaceEnrollmentService
+from .services.frame_decoding import read_frame_request
+from .services.frame_admission import FrameDropped, face_frame_admission, gesture_frame_admission
+from .services.description_worker import DescriptionWorker
+
+# Static gesture metadata, built once per process and published in one
+# assignment as GESTURE_INFO_CACHE['entry'] = {'payload': ..., 'etag': ...}
+GESTURE_INFO_CACHE = {}
+
+# Marks the end of a streamed iterator pulled from a worker thread
+_STREAM_END = object()
+
+
+def streaming_response(request, content, content_type):
+    """
+    StreamingHttpResponse that streams under both WSGI and ASGI. Under ASGI
+    (daphne, also used by runserver) Django reads a sync iterator to the end
+    before sending anything, so there each chunk is pulled from `content`
+    on a worker thread and handed over as an async iterator instead.
+    """
+    if isinstance(request._request, ASGIRequest):
+        content = _iterate_in_thread(content)
+    return StreamingHttpResponse(content, content_type=content_type)
+
+
+async def _iterate_in_thread(content):
+    iterator = iter(content)
+    # The generators behind these streams use the ORM, so stale connections
+    # are closed around each step
+    pull = database_sync_to_async(next, thread_sensitive=False)
+    try:
+        while True:
+            chunk = await pull(iterator, _STREAM_END)
+            if chunk is _STREAM_END:
+                break
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await database_sync_to_async(close, thread_sensitive=False)()
 
-# Global cache for face embeddings (session-based)
-FACE_EMBEDDING_CACHE = {}
 
 class ProcessingViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['post'])
@@ -23,6 +72,8 @@ class ProcessingViewSet(viewsets.ViewSet):
         Analyze image from data URI: perform object detection and generate AI caption
         Expects: {'imageDataUri': 'data:image/jpeg;base64,...'}
         Returns: {'imageDataUrl': '...', 'objects': [...], 'caption': '...'}
+        With description_mode=async the caption is null and 'description_id'
+        is returned for get_description.
         """
         image_data_uri = request.data.get('imageDataUri')
         if not image_data_uri:
@@ -34,7 +85,10 @@ class ProcessingViewSet(viewsets.ViewSet):
             confidence = 0.5
 
         svc = ImageAnalysisService()
-        result = svc.analyze_image_data_uri(image_data_uri, confidence_threshold=confidence)
+        result = svc.analyze_image_data_uri(
+            image_data_uri, confidence_threshold=confidence,
+            async_description=request.data.get('description_mode') == 'async'
+        )
 
         if 'error' in result:
             return Response({'error': result['error']}, status=status.HTTP_400_BAD_REQUEST)
@@ -44,7 +98,9 @@ class ProcessingViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['post'])
     def direct_facial_recognition(self, request):
         """
-        Direct facial recognition processing - upload file and get results immediately
+        Direct facial recognition processing - upload file and get results immediately.
+        With description_mode=async the AI description is generated in the
+        background; fetch it with get_description using 'description_id'.
         """
         try:
             # Get uploaded file
@@ -67,14 +123,18 @@ class ProcessingViewSet(viewsets.ViewSet):
                 for chunk in uploaded_file.chunks():
                     destination.write(chunk)
 
-            # Process the face
-            service = FacialRecognitionService()
-            results = service.process_face(temp_path, name)
+            # Process the face (only detection scores and boxes are used here)
+            service = FacialRecognitionService(mode='detection')
+            analysis = service.analyze_image(temp_path)
+            results = service.process_face(
+                temp_path, name, analysis=analysis,
+                async_description=request.POST.get('description_mode') == 'async'
+            )
 
-            # Generate result image with face box
+            # Generate result image with face box from the same detection pass
             output_filename = f"facial_result_{file_id}.jpg"
             output_path = os.path.join(settings.MEDIA_ROOT, 'temp', output_filename)
-            service.draw_face_box(temp_path, output_path)
+            service.draw_face_box(temp_path, output_path, analysis=analysis)
 
             # Clean up temp input file
             os.remove(temp_path)
@@ -84,7 +144,9 @@ class ProcessingViewSet(viewsets.ViewSet):
                 'status': 'completed',
                 'recognized': results['recognized'],
                 'confidence': results['confidence'],
+                'faces': results['faces'],
                 'ai_description': results['ai_description'],
+                'description_id': results.get('description_id'),
                 'technical_summary': results['technical_summary'],
                 'result_image_url': request.build_absolute_uri(settings.MEDIA_URL + f'temp/{output_filename}')
             })
@@ -127,7 +189,7 @@ class ProcessingViewSet(viewsets.ViewSet):
             # Generate result image with pose landmarks
             output_filename = f"gesture_result_{file_id}.jpg"
             output_path = os.path.join(settings.MEDIA_ROOT, 'temp', output_filename)
-            service.draw_pose_landmarks(temp_path, results['landmarks'], output_path)
+            service.draw_hand_landmarks(temp_path, results['landmarks'], output_path)
 
             # Clean up temp input file
             os.remove(temp_path)
@@ -147,10 +209,45 @@ class ProcessingViewSet(viewsets.ViewSet):
                 os.remove(temp_path)
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'])
+    def batch_gesture_recognition(self, request):
+        """
+        Recognize gestures in several uploaded images ('files') at once.
+        Images are processed in parallel on static-image graphs, isolated
+        from the realtime gesture streams.
+        """
+        try:
+            uploaded_files = request.FILES.getlist('files')
+            if not uploaded_files:
+                return Response({'error': 'No files uploaded'}, status=status.HTTP_400_BAD_REQUEST)
+            if len(uploaded_files) > settings.GESTURE_BATCH_MAX_FILES:
+                return Response(
+                    {'error': f'At most {settings.GESTURE_BATCH_MAX_FILES} images can be processed at once'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if sum(f.size for f in uploaded_files) > settings.GESTURE_BATCH_MAX_BYTES:
+                return Response(
+                    {'error': f'Batch exceeds the {settings.GESTURE_BATCH_MAX_BYTES // (1024 * 1024)}MB upload limit'},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                )
+
+            service = GestureControlService()
+            results = service.process_gesture_batch([(f.name, f.read()) for f in uploaded_files])
+
+            return Response({
+                'status': 'completed',
+                'count': len(results),
+                'results': results
+            })
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=False, methods=['post'])
     def direct_image_segmentation(self, request):
         """
-        Direct image segmentation processing - upload file and get results immediately
+        Direct image segmentation processing - upload file and get results immediately.
+        Supports description_mode=async like direct_facial_recognition.
         """
         try:
             # Get uploaded file
@@ -174,7 +271,9 @@ class ProcessingViewSet(viewsets.ViewSet):
 
             # Process the segmentation
             service = ImageSegmentationService()
-            results = service.process_segmentation(temp_path)
+            results = service.process_segmentation(
+                temp_path, async_description=request.POST.get('description_mode') == 'async'
+            )
 
             # Get prediction mask for visualization
             prediction = service.get_prediction_mask(temp_path)
@@ -192,6 +291,7 @@ class ProcessingViewSet(viewsets.ViewSet):
                 'status': 'completed',
                 'segments': results['segments'],
                 'ai_description': results['ai_description'],
+                'description_id': results.get('description_id'),
                 'technical_summary': results['technical_summary'],
                 'processing_time': results['processing_time'],
                 'model_used': results['model_used'],
@@ -208,7 +308,8 @@ class ProcessingViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['post'])
     def direct_object_detection(self, request):
         """
-        Direct object detection processing - upload file and get results immediately
+        Direct object detection processing - upload file and get results immediately.
+        Supports description_mode=async like direct_facial_recognition.
         """
         try:
             # Get uploaded file
@@ -263,14 +364,22 @@ class ProcessingViewSet(viewsets.ViewSet):
             os.remove(temp_path)
 
             # Generate AI description using Gemini
-            try:
-                from .services.gemini_service import GeminiService
-                gemini_service = GeminiService()
-                ai_description = gemini_service.generate_description(detections, 'object_detection')
-            except Exception as e:
-                print(f"Gemini API error: {e}")
-                # Fallback to simple description
-                ai_description = f"Detected {len(detections)} objects in the image using YOLOv8 model."
+            fallback_description = f"Detected {len(detections)} objects in the image using YOLOv8 model."
+            description_id = None
+            if request.POST.get('description_mode') == 'async':
+                ai_description = None
+                description_id = DescriptionWorker().submit(
+                    'object_detection', lambda: GeminiService().generate_description(detections, 'object_detection'),
+                    fallback=fallback_description
+                )
+            else:
+                try:
+                    gemini_service = GeminiService()
+                    ai_description = gemini_service.generate_description(detections, 'object_detection')
+                except Exception as e:
+                    print(f"Gemini API error: {e}")
+                    # Fallback to simple description
+                    ai_description = fallback_description
             
             technical_summary = f"Object detection completed with {len(detections)} detections found using confidence threshold of {confidence}."
             
@@ -279,6 +388,7 @@ class ProcessingViewSet(viewsets.ViewSet):
                 'status': 'completed',
                 'detections': detections,
                 'ai_description': ai_description,
+                'description_id': description_id,
                 'technical_summary': technical_summary,
                 'processing_time': 0,  # Could be calculated if needed
                 'model_used': 'YOLOv8',
@@ -292,10 +402,37 @@ class ProcessingViewSet(viewsets.ViewSet):
                 os.remove(temp_path)
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['get'])
+    def get_description(self, request):
+        """
+        Fetch a background AI description by description_id. Pass wait=<seconds>
+        to hold the request until it is ready (long polling).
+        """
+        try:
+            description_id = request.query_params.get('description_id')
+            try:
+                description_id = str(uuid.UUID(description_id))
+            except (TypeError, ValueError):
+                return Response({'error': 'Valid description_id required'}, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                wait = min(float(request.query_params.get('wait', 0)), settings.LLM_DESCRIPTION_MAX_WAIT_SECONDS)
+            except ValueError:
+                wait = 0.0
+
+            description = DescriptionWorker().wait(description_id, max(0.0, wait))
+            if description is None:
+                return Response({'error': 'Description not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            return Response(DescriptionWorker.serialize(description))
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=False, methods=['post'])
     def register_face(self, request):
         """
-        Store face embedding in memory cache with session ID
+        Store face embedding in the persistent embedding store with session ID
         """
         try:
             uploaded_file = request.FILES.get('file')
@@ -329,17 +466,15 @@ class ProcessingViewSet(viewsets.ViewSet):
             if embedding is None:
                 return Response({'error': 'No face detected in the uploaded image'}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Generate session ID and store in cache
-            session_id = str(uuid.uuid4())
-            FACE_EMBEDDING_CACHE[session_id] = {
-                'embedding': embedding,
-                'name': name.strip()
-            }
+            # Store embedding; the generated session ID is visible to every worker
+            entry = FaceEmbeddingStore().add(name.strip(), embedding, ttl=request.POST.get('ttl'))
             
             return Response({
-                'session_id': session_id,
+                'session_id': str(entry.session_id),
                 'name': name.strip(),
                 'status': 'registered',
+                'expires_at': entry.expires_at.isoformat(),
+                'ttl_seconds': entry.ttl_seconds,
                 'message': 'Face embedding extracted and stored successfully'
             })
 
@@ -348,43 +483,168 @@ class ProcessingViewSet(viewsets.ViewSet):
                 os.remove(temp_path)
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'])
+    def bulk_register_faces(self, request):
+        """
+        Enroll many identities at once from a zip archive ('archive') or from
+        several files ('files') with matching 'names'. Reference images of the
+        same identity are averaged into one normalized embedding.
+        Progress is streamed as newline-delimited JSON unless stream=false.
+        """
+        try:
+            archive = request.FILES.get('archive')
+            uploaded_files = request.FILES.getlist('files')
+            names = request.POST.getlist('names')
+            ttl = request.POST.get('ttl')
+
+            if not archive and not uploaded_files:
+                return Response({'error': 'Upload a zip archive or one or more files'}, status=status.HTTP_400_BAD_REQUEST)
+
+            enrollment = FaceEnrollmentService()
+            try:
+                if archive:
+                    items = enrollment.collect_from_archive(archive)
+                else:
+                    items = enrollment.collect_from_files(uploaded_files, names)
+            except (ValueError, zipfile.BadZipFile) as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if not items:
+                return Response({'error': 'No labelled images found'}, status=status.HTTP_400_BAD_REQUEST)
+
+            events = enrollment.enroll(items, ttl=ttl)
+
+            if request.POST.get('stream', 'true').lower() == 'false':
+                identities = []
+                failures = []
+                summary = {}
+                for event in events:
+                    if event['type'] == 'identity':
+                        identities.append(event)
+                    elif event['type'] == 'progress' and not event['ok']:
+                        failures.append({'file': event['file'], 'error': event['error']})
+                    elif event['type'] == 'done':
+                        summary = event
+                    elif event['type'] == 'error':
+                        return Response({
+                            'error': event['error'],
+                            'identities': identities,
+                            'failures': failures
+                        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                return Response({
+                    'identities': identities,
+                    'failures': failures,
+                    'summary': summary
+                })
+
+            return streaming_response(
+                request,
+                (json.dumps(event) + '\n' for event in events),
+                'application/x-ndjson'
+            )
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
     @action(detail=False, methods=['post'])
     def recognize_frame(self, request):
         """
-        Compare webcam frame against stored embedding
+        Compare webcam frame against stored embedding.
+        The frame is a raw JPEG/WebP body (options in the query string), a
+        multipart 'frame' file, or the legacy base64 'frame' field.
+        While a session's frame is processing only its newest frame waits;
+        superseded frames are answered at once with status 'dropped'.
         """
         try:
-            session_id = request.POST.get('session_id')
-            frame_base64 = request.POST.get('frame')
+            frame_data, params = read_frame_request(request)
+            session_id = params.get('session_id')
             
             if not session_id:
                 return Response({'error': 'session_id required'}, status=status.HTTP_400_BAD_REQUEST)
             
-            if not frame_base64:
+            if not frame_data:
                 return Response({'error': 'frame data required'}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Get reference embedding from cache
-            if session_id not in FACE_EMBEDDING_CACHE:
-                return Response({'error': 'Session not found or expired'}, status=status.HTTP_404_NOT_FOUND)
+            # Get reference embedding from the shared store
+            try:
+                cache_data = FaceEmbeddingStore().get(session_id)
+            except FaceSessionExpired as e:
+                return Response({'error': f'Session {e.reason}, please register the face again', 'reason': e.reason}, status=status.HTTP_410_GONE)
+
+            if cache_data is None:
+                return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
             
-            cache_data = FACE_EMBEDDING_CACHE[session_id]
             reference_embedding = cache_data['embedding']
             person_name = cache_data['name']
             
             # Process frame
             service = FacialRecognitionService()
-            results = service.process_webcam_frame(frame_base64, reference_embedding, person_name)
+            try:
+                with face_frame_admission.admit(session_id):
+                    results = service.process_webcam_frame(
+                        frame_data, reference_embedding, person_name,
+                        tracker=face_trackers.get(session_id),
+                        det_size=params.get('det_size')
+                    )
+            except FrameDropped as e:
+                return Response({
+                    'status': 'dropped',
+                    'reason': e.reason,
+                    'session_id': session_id,
+                    'recommended': face_frame_admission.recommendation(session_id)
+                })
             
             if results['error']:
                 return Response({'error': results['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
             return Response({
+                'status': 'processed',
+                'recommended': face_frame_admission.recommendation(session_id),
                 'faces': results['faces'],
                 'session_id': session_id,
                 'reference_name': person_name,
                 'total_faces': len(results['faces']),
                 'matched_faces': len([f for f in results['faces'] if f['is_match']]),
-                'unknown_faces': len([f for f in results['faces'] if not f['is_match']])
+                'unknown_faces': len([f for f in results['faces'] if not f['is_match']]),
+                'frame_skipped': results['skipped'],
+                'timing': service.get_timing(skipped=results['skipped'])
+            })
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'])
+    def unregister_face(self, request):
+        """
+        Remove a registered face session and free its embedding
+        """
+        try:
+            session_id = request.data.get('session_id')
+
+            if not session_id:
+                return Response({'error': 'session_id required'}, status=status.HTTP_400_BAD_REQUEST)
+
+            face_trackers.discard(session_id)
+            if not FaceEmbeddingStore().unregister(session_id):
+                return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            return Response({
+                'session_id': session_id,
+                'status': 'unregistered'
+            })
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'])
+    def get_metrics(self, request):
+        """
+        Processing metrics for this worker plus shared face store usage
+        """
+        try:
+            return Response({
+                'metrics': metrics.snapshot(),
+                'face_store': FaceEmbeddingStore().stats()
             })
 
         except Exception as e:
@@ -393,23 +653,53 @@ class ProcessingViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['post'])
     def process_gesture_frame(self, request):
         """
-        Process webcam frame with MediaPipe Hands for gesture recognition and UI control
+        Process webcam frame with MediaPipe Hands for gesture recognition and UI control.
+        response_mode=lean returns only gestures and fired actions (plus landmarks
+        when include_landmarks=true); static metadata comes from get_gesture_info.
+        The frame is sent, and superseded frames dropped, as in recognize_frame.
         """
         try:
-            frame_base64 = request.POST.get('frame')
+            frame_data, params = read_frame_request(request)
             
-            if not frame_base64:
+            if not frame_data:
                 return Response({'error': 'frame data required'}, status=status.HTTP_400_BAD_REQUEST)
             
+            # Each client keeps its own tracking graph; fall back to the client address
+            session_id = params.get('session_id') or f"addr:{request.META.get('REMOTE_ADDR', 'unknown')}"
+
+            lean = params.get('response_mode') == 'lean'
+            include_landmarks = params.get('include_landmarks', '').lower() in ('1', 'true')
+
             # Process frame with MediaPipe Hands
             service = GestureControlService()
-            results = service.process_hand_gestures(frame_base64)
-            
+            try:
+                with gesture_frame_admission.admit(session_id):
+                    results = service.process_hand_gestures(
+                        frame_data, session_id=session_id, lean=lean, include_landmarks=include_landmarks
+                    )
+            except FrameDropped as e:
+                return Response({
+                    'status': 'dropped',
+                    'reason': e.reason,
+                    'recommended': gesture_frame_admission.recommendation(session_id)
+                })
+            recommended = gesture_frame_admission.recommendation(session_id)
+            
+            if results.get('busy'):
+                return Response({'error': results['error']}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
             if 'error' in results:
                 return Response({'error': results['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            if lean:
+                results['status'] = 'processed'
+                results['recommended'] = recommended
+                return Response(results)
             
             return Response({
                 'success': True,
+                'status': 'processed',
+                'recommended': recommended,
                 'mode': 'hands',
                 'results': results,
                 'timestamp': str(uuid.uuid4())  # Unique identifier for this frame
@@ -421,9 +711,15 @@ class ProcessingViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def get_gesture_info(self, request):
         """
-        Get educational information about MediaPipe Hands
+        Get educational information about MediaPipe Hands.
+        The payload is static, so it is built once and served with ETag and
+        Cache-Control headers for clients to cache.
         """
         try:
+            entry = GESTURE_INFO_CACHE.get('entry')
+            if entry is not None:
+                return self._cached_gesture_info(request, entry)
+
             service = GestureControlService()
             educational_info = service._get_educational_info()
             
@@ -446,7 +742,9 @@ class ProcessingViewSet(viewsets.ViewSet):
                     {'gesture': 'Fist', 'emoji': '✊', 'action': 'Close current view', 'description': 'Exit or close current screen'},
                     {'gesture': 'OK Sign', 'emoji': '👌', 'action': 'Confirm/accept', 'description': 'Confirm actions or selections'},
                     {'gesture': 'Wave', 'emoji': '👋', 'action': 'Toggle between features', 'description': 'Switch between different modes'},
-                    {'gesture': 'Open Hand', 'emoji': '👐', 'action': 'Open menu', 'description': 'Access main menu or options'}
+                    {'gesture': 'Open Hand', 'emoji': '👐', 'action': 'Open menu', 'description': 'Access main menu or options'},
+                    {'gesture': 'Swipe Left', 'emoji': '👈', 'action': 'Go back to previous feature', 'description': 'Move an open hand quickly to the left'},
+                    {'gesture': 'Swipe Right', 'emoji': '👉', 'action': 'Navigate to next feature', 'description': 'Move an open hand quickly to the right'}
                 ],
                 'technical_details': {
                     'landmarks_per_hand': 21,
@@ -457,15 +755,36 @@ class ProcessingViewSet(viewsets.ViewSet):
                 }
             }
             
-            return Response({
+            payload = {
                 'mode': 'hands',
                 'educational_info': educational_info,
                 'general_info': general_info
-            })
+            }
+            entry = {
+                'payload': payload,
+                'etag': quote_etag(hashlib.md5(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest())
+            }
+            GESTURE_INFO_CACHE['entry'] = entry
+
+            return self._cached_gesture_info(request, entry)
 
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def _cached_gesture_info(self, request, entry):
+        """Serve the cached gesture info, answering 304 when the client copy is current"""
+        etag = entry['etag']
+        # Weak comparison, as If-None-Match requires
+        client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if '*' in client_etags or any((tag[2:] if tag.startswith('W/') else tag) == etag for tag in client_etags):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(entry['payload'])
+
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=settings.GESTURE_INFO_MAX_AGE)
+        return response
+
     @action(detail=False, methods=['post'])
     def chatbot(self, request):
         """
@@ -488,8 +807,51 @@ class ProcessingViewSet(viewsets.ViewSet):
             return Response({
                 'response': response['response'],
                 'timestamp': response['timestamp'],
-                'context': response['context']
+                'context': response['context'],
+                'source': response['source']
             })
             
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'])
+    def chatbot_stream(self, request):
+        """
+        Streaming chatbot endpoint (Server-Sent Events)
+        Expects the same body as chatbot. Sends one 'token' event per text
+        chunk as the model generates it, then a 'done' event with the same
+        {'response', 'timestamp', 'context', 'source'} the chatbot endpoint returns.
+        Clients without streaming support keep using chatbot.
+        """
+        try:
+            message = request.data.get('message')
+            context = request.data.get('context', 'home')
+            history = request.data.get('history', [])
+
+            if not message or not message.strip():
+                return Response({'error': 'Message is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Initialize chatbot service
+            chatbot_service = ChatbotService()
+
+            def events():
+                for event, payload in chatbot_service.stream_response(message, context, history):
+                    if event == 'token':
+                        data = {'text': payload}
+                    else:
+                        data = {
+                            'response': payload['response'],
+                            'timestamp': payload['timestamp'],
+                            'context': payload['context'],
+                            'source': payload['source']
+                        }
+                    yield f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+            response = streaming_response(request, events(), 'text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            # Stop nginx from buffering the stream
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)